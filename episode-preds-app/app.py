@@ -1,49 +1,57 @@
-from flask import Flask, render_template, jsonify
-import polars as pl
-import onnxruntime
+import time
+_boot_start = time.perf_counter()
+
+from flask import Flask, render_template, jsonify, request
 import os
 from datetime import datetime, timedelta, timezone
 import json
+import math
 import logging
-from logging.handlers import RotatingFileHandler
-import requests
-import xml.etree.ElementTree as ET
-from waitress import serve
 import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from model_registry import ModelRegistry
+from feed_cache import FeedCache
+from shared_feed import SharedFeedCache, SharedFeedFile
+from shared_predictions import PublishedPredictions, SharedPredictionsFile
+from http_cache import IMMUTABLE_CACHE_CONTROL, compress_response, etag_matches, static_fingerprint
+from structured_logging import HOT_PATH_LOGGER, end_request, log_stage, request_stages, setup_logging, start_request
+from keyword_features import DEFAULT_VOCABULARY, feature_layout, load_vocabulary
+from prediction_store import PredictionStore, StaleCursorError, classify_episode_type, parse_query_time
 
-# Enhanced logging configuration
-def setup_logging():
-    # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
-    # Configure file handler with rotation
-    file_handler = RotatingFileHandler(
-        'logs/app.log',
-        maxBytes=1024 * 1024,  # 1MB
-        backupCount=10
-    )
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO)
-    
-    # Configure console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s'
-    ))
-    
-    # Setup root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        handlers=[file_handler, console_handler]
-    )
-    
-    return logging.getLogger('duncd_on_app')
+# Heavy dependencies (numpy, polars, ElementTree, onnxruntime, waitress) are
+# imported where they're first used so they stay off the import path. In
+# cold start mode the server starts listening before any of them load.
+COLD_START_MODE = os.environ.get('COLD_START_MODE', '0') == '1'
+
+# Set by prefork.py for multi-process serving: the 'refresher' process owns
+# upstream fetches and catalog scoring, each 'worker' process only serves.
+# Unset, this one process does everything.
+SERVING_ROLE = os.environ.get('SERVING_ROLE', '')
+# prefork.py's stable name for this process ('refresher', 'worker-0', ...)
+SERVING_SLOT = os.environ.get('SERVING_SLOT') or SERVING_ROLE
+
+# Seconds spent in each startup phase, printed once the server is ready
+startup_timings = {'imports': time.perf_counter() - _boot_start}
+
+def _record_startup_phase(name, start):
+    startup_timings[name] = time.perf_counter() - start
 
-logger = setup_logging()
+def log_startup_timings():
+    total = time.perf_counter() - _boot_start
+    breakdown = ', '.join(f"{name}={secs * 1000:.1f}ms" for name, secs in startup_timings.items())
+    logger.info("Startup timing (%s mode): %s, total=%.1fms",
+                'cold start' if COLD_START_MODE else 'eager', breakdown, total * 1000)
+
+_phase_start = time.perf_counter()
+logger = setup_logging(file_name=f'app.{SERVING_SLOT}.log' if SERVING_SLOT else 'app.log')
+# Per-request info logs on the hot path, sampled by LOG_SAMPLE_RATE
+request_logger = logging.getLogger(HOT_PATH_LOGGER)
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+_record_startup_phase('logging', _phase_start)
 
 # Initialize Flask with production configurations
+_phase_start = time.perf_counter()
 app = Flask(__name__)
 app.config.update(
     SECRET_KEY=os.environ.get('SECRET_KEY', secrets.token_hex(32)),
@@ -53,6 +61,31 @@ app.config.update(
     PERMANENT_SESSION_LIFETIME=timedelta(days=1)
 )
 
+# Request id, sampling decision and stage timings for structured logs
+@app.before_request
+def start_request_logging():
+    request.environ['duncd_on.start'] = time.perf_counter()
+    request.environ['duncd_on.request_id'] = start_request(request.headers.get('X-Request-ID'), LOG_SAMPLE_RATE)
+
+@app.after_request
+def log_request_summary(response):
+    started = request.environ.get('duncd_on.start')
+    duration_ms = round((time.perf_counter() - started) * 1000, 3) if started else None
+    response.headers['X-Request-ID'] = request.environ.get('duncd_on.request_id', '')
+    logger.info(
+        "%s %s %s", request.method, request.path, response.status_code,
+        extra={
+            'http': {'method': request.method, 'path': request.path,
+                     'status': response.status_code, 'duration_ms': duration_ms},
+            'stages_ms': request_stages(),
+        }
+    )
+    return response
+
+@app.teardown_request
+def end_request_logging(exc):
+    end_request()
+
 # Add security headers middleware
 @app.after_request
 def add_security_headers(response):
@@ -62,6 +95,29 @@ def add_security_headers(response):
     response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
     return response
 
+# Fingerprint static URLs (url_for('static', ...) gets ?v=<content hash>) so
+# they can be cached for a year and still bust on deploy
+@app.url_defaults
+def add_static_fingerprint(endpoint, values):
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        values['v'] = static_fingerprint(app.static_folder, values['filename'])
+
+@app.after_request
+def add_caching_and_compression(response):
+    static_key = None
+    if request.endpoint == 'static' and response.status_code == 200 and 'v' in request.args:
+        # Only the current fingerprint is immutable and memoized; any other
+        # ?v= (stale or made up) is served normally, so clients can't pin
+        # the wrong bytes for a year or grow the memo without bound
+        filename = os.path.normpath(request.view_args['filename'])
+        fingerprint = static_fingerprint(app.static_folder, filename)
+        if request.args['v'] == fingerprint:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            static_key = f"{filename}?v={fingerprint}"
+    return compress_response(response, request.headers.get('Accept-Encoding', ''), static_key)
+
+_record_startup_phase('flask_app', _phase_start)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -69,28 +125,98 @@ def not_found_error(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f'Server Error: {error}')
+    logger.error('Server Error: %s', error)
     return jsonify({'error': 'Internal server error'}), 500
 
-# Load the ONNX model with error handling
-try:
+# Load the ONNX model with error handling. The registry can swap in a
+# retrained model later without restarting the container. Images built from
+# the Dockerfile ship the bundled model's graph-optimized copy in
+# MODEL_OPTIMIZED_DIR; reloaded models are optimized and cached on reload.
+model_registry = ModelRegistry(
+    os.environ.get('MODEL_PATH', 'episode_banger_model.onnx'),
+    optimized_dir=os.environ.get('MODEL_OPTIMIZED_DIR') or None
+)
+
+def load_model():
+    start = time.perf_counter()
     logger.info("Loading ONNX model...")
-    session = onnxruntime.InferenceSession("episode_banger_model.onnx")
+    model_registry.reload()
+    _record_startup_phase('model_load', start)
     logger.info("ONNX model loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load ONNX model: {e}")
-    raise SystemExit("Could not load ONNX model. Exiting...")
+
+# Set when the cold start background load fails, so /health stops
+# reporting healthy for a process that has no model to serve
+model_load_error = None
+
+def _load_model_in_background():
+    global model_load_error
+    try:
+        load_model()
+        log_startup_timings()
+    except Exception as e:
+        # Requests will retry the load through model_registry.current()
+        model_load_error = str(e)
+        logger.error("Background model load failed: %s", e, exc_info=True)
+
+def start_background_model_load():
+    """
+    Cold start mode: load the model once the port is bound. The first
+    /predict waits on this load if it's still running.
+    """
+    threading.Thread(target=_load_model_in_background, name='model-loader', daemon=True).start()
+
+if COLD_START_MODE:
+    if SERVING_ROLE:
+        # prefork.py bound the port before forking; main() starts it otherwise
+        start_background_model_load()
+else:
+    try:
+        load_model()
+    except Exception as e:
+        logger.error("Failed to load ONNX model: %s", e)
+        raise SystemExit("Could not load ONNX model. Exiting...")
+
+# Under prefork.py an admin reload only reaches the process that handled it,
+# so every process watches the model file to pick up the same change
+MODEL_WATCH_INTERVAL = os.environ.get('MODEL_WATCH_INTERVAL') or ('10' if SERVING_ROLE else None)
+if MODEL_WATCH_INTERVAL:
+    model_registry.start_watching(float(MODEL_WATCH_INTERVAL))
 
 @app.route('/health')
 def health():
-    return jsonify({"status": "healthy"}), 200
+    # Don't block on the model here so health checks answer during a cold start
+    if model_registry.active_sha256 is None and model_load_error is not None:
+        return jsonify({"status": "unhealthy", "error": f"Model failed to load: {model_load_error}"}), 503
+    return jsonify({"status": "healthy", "model_sha256": model_registry.active_sha256}), 200
+
+@app.route('/admin/reload-model', methods=['POST'])
+def reload_model():
+    # Disabled unless an admin token is configured
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Not found'}), 404
+    if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({'error': 'Forbidden'}), 403
+
+    try:
+        reloaded = model_registry.reload()
+    except Exception as e:
+        logger.error("Model reload failed, keeping current model: %s", e, exc_info=True)
+        return jsonify({'error': f'Model reload failed: {e}'}), 500
+
+    return jsonify({'reloaded': reloaded, 'model_sha256': model_registry.current().sha256}), 200
+
+def fetch_feed():
+    # urllib rather than requests: flask has already imported it, and
+    # requests would add its own import time to the first /predict
+    import urllib.error
+    import urllib.request
 
-def get_recent_episodes():
     rss_url = os.environ.get('RSS_FEED_URL')
     if not rss_url:
         raise ValueError("RSS_FEED_URL environment variable not set")
     
-    logger.info(f"Fetching RSS feed from {rss_url}...")
+    logger.info("Fetching RSS feed from %s...", rss_url)
     
     # HTTP headers for RSS feed request
     headers = {
@@ -98,121 +224,545 @@ def get_recent_episodes():
     }
     
     try:
-        response = requests.get(rss_url, headers=headers)
-        response.raise_for_status()
+        with urllib.request.urlopen(urllib.request.Request(rss_url, headers=headers)) as response:
+            content = response.read()
         logger.info("RSS feed fetched successfully")
-    except requests.RequestException as e:
-        logger.error(f"Error fetching RSS feed: {e}", exc_info=True)
+        return content
+    except (urllib.error.URLError, OSError) as e:
+        logger.error("Error fetching RSS feed: %s", e, exc_info=True)
         raise RuntimeError(f"Error fetching RSS feed: {e}")
-    
+
+def parse_feed(content):
+    """Parse every episode in the feed, newest first."""
+    import xml.etree.ElementTree as ET
+
     try:
-        root = ET.fromstring(response.content)
+        root = ET.fromstring(content)
         channel = root.find('channel')
         if channel is None:
             raise ValueError("No channel element found in RSS feed")
         
         episodes = []
-        # Make cutoff_date timezone-aware (UTC)
-        cutoff_date = (datetime.now(timezone.utc) - timedelta(days=7))
-        
         for item in channel.findall('item'):
             pub_date = item.find('pubDate')
             if pub_date is not None:
                 # pub_date_dt is offset-aware
                 pub_date_dt = datetime.strptime(pub_date.text, '%a, %d %b %Y %H:%M:%S %z')
-                if pub_date_dt > cutoff_date:
-                    episodes.append({
-                        'episode': item.find('title').text if item.find('title') is not None else 'Unknown Title',
-                        'description': item.find('description').text if item.find('description') is not None else '',
-                        'date': pub_date_dt.isoformat(),
-                        'duration': item.find('.//{http://www.itunes.com/dtds/podcast-1.0.dtd}duration').text
-                            if item.find('.//{http://www.itunes.com/dtds/podcast-1.0.dtd}duration') is not None else ''
-                    })
+                episodes.append({
+                    'episode': item.find('title').text if item.find('title') is not None else 'Unknown Title',
+                    'description': item.find('description').text if item.find('description') is not None else '',
+                    'date': pub_date_dt.isoformat(),
+                    'duration': item.find('.//{http://www.itunes.com/dtds/podcast-1.0.dtd}duration').text
+                        if item.find('.//{http://www.itunes.com/dtds/podcast-1.0.dtd}duration') is not None else '',
+                    'guid': item.find('guid').text if item.find('guid') is not None else item.find('title').text,
+                    'pub_date': pub_date_dt
+                })
         
-        logger.info(f"Filtered to {len(episodes)} recent episodes")
-        return pl.DataFrame(episodes).lazy().collect()
+        episodes.sort(key=lambda episode: episode['pub_date'], reverse=True)
+        logger.info("Parsed %d episodes from RSS feed", len(episodes))
+        return episodes
     
     except ET.ParseError as e:
-        logger.error(f"Error parsing RSS feed XML: {e}", exc_info=True)
+        logger.error("Error parsing RSS feed XML: %s", e, exc_info=True)
         raise RuntimeError(f"Error parsing RSS feed XML: {e}")
 
+def _lazy_embedder():
+    # Defer loading ModernBERT until the first ingest job needs it
+    embed = None
+    def embed_text(text):
+        nonlocal embed
+        if embed is None:
+            from feature_store import modernbert_embedder
+            embed = modernbert_embedder()
+        return embed(text)
+    return embed_text
+
+# Optional store of precomputed description embeddings for models trained
+# with them. With EMBED_ON_INGEST=1 new episodes are embedded in the
+# background; until then they get the store's fallback vector.
+feature_store = None
+if os.environ.get('FEATURE_STORE_DIR'):
+    from feature_store import EmbeddingFeatureStore
+    feature_store = EmbeddingFeatureStore(
+        os.environ['FEATURE_STORE_DIR'],
+        # Serving workers never see the feed's raw ingest, the refresher does
+        embed=_lazy_embedder() if os.environ.get('EMBED_ON_INGEST', '0') == '1' and SERVING_ROLE != 'worker' else None
+    )
+
+def parse_and_ingest_feed(content):
+    episodes = parse_feed(content)
+    if feature_store is not None:
+        feature_store.schedule_missing(episodes)
+    return episodes
+
+# Upstream is fetched at most once per refresh interval; /predict's
+# Cache-Control max-age counts down to the next refresh. Under prefork.py
+# only the refresher fetches; it publishes each fetch to a memory-mapped
+# file in SHARED_CACHE_DIR that the serving workers read instead, and then
+# publishes the scored /predict payload next to it.
+FEED_REFRESH_SECONDS = float(os.environ.get('FEED_REFRESH_SECONDS', 300))
+shared_feed = SharedFeedFile(os.path.join(os.environ['SHARED_CACHE_DIR'], 'feed.bin')) if SERVING_ROLE else None
+shared_predictions = (SharedPredictionsFile(os.path.join(os.environ['SHARED_CACHE_DIR'], 'predictions.json'))
+                      if SERVING_ROLE else None)
+
+if SERVING_ROLE == 'worker':
+    feed_cache = SharedFeedCache(
+        shared_feed,
+        parse_feed,
+        FEED_REFRESH_SECONDS,
+        on_new_version=lambda snapshot: schedule_rescoring()
+    )
+else:
+    feed_cache = FeedCache(
+        (lambda: shared_feed.publish(fetch_feed())) if SERVING_ROLE == 'refresher' else fetch_feed,
+        parse_and_ingest_feed,
+        FEED_REFRESH_SECONDS,
+        on_new_version=lambda snapshot: schedule_rescoring()
+    )
+
+def count_recent_episodes(snapshot, days=7):
+    # Make cutoff_date timezone-aware (UTC)
+    cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days))
+    count = 0
+    # Episodes are newest first, so stop at the first one outside the window
+    for episode in snapshot.episodes:
+        if episode['pub_date'] <= cutoff_date:
+            break
+        count += 1
+    return count
+
+def get_recent_episodes(snapshot, count):
+    import polars as pl
+
+    episodes = [
+        {key: episode[key] for key in ('guid', 'episode', 'description', 'date', 'duration')}
+        for episode in snapshot.episodes[:count]
+    ]
+    request_logger.info("Filtered to %d recent episodes", len(episodes))
+    return pl.DataFrame(episodes).lazy().collect()
 
+# Every keyword flag is computed in one scan per title/description. Models
+# trained with a custom vocabulary (train_banger_model.py
+# --keyword-vocabulary) need the same file in KEYWORD_VOCABULARY.
+KEYWORD_VOCABULARY = (load_vocabulary(os.environ['KEYWORD_VOCABULARY']) if os.environ.get('KEYWORD_VOCABULARY')
+                      else DEFAULT_VOCABULARY)
+FEATURE_COLUMNS = feature_layout([feature.name for feature in KEYWORD_VOCABULARY])
+_keyword_engine = None
 
-def engineer_features(df):
-    logger.info("Starting feature engineering...")
+def keyword_engine():
+    # Built on first use; compiling it needs numpy, which startup avoids
+    global _keyword_engine
+    if _keyword_engine is None:
+        from keyword_features import KeywordFeatureEngine
+        _keyword_engine = KeywordFeatureEngine(KEYWORD_VOCABULARY)
+    return _keyword_engine
+
+# Columns produced by engineer_features before any embedding columns
+BASE_FEATURE_COUNT = len(FEATURE_COLUMNS)
+
+def engineer_features(df, feature_store=None, keep_guid=False):
+    import polars as pl
+
+    request_logger.info("Starting feature engineering...")
     df_types = df.select(
+        pl.col("guid"),
         pl.col("episode"),
         pl.col("date").str.strptime(pl.Datetime, format="%Y-%m-%dT%H:%M:%S%z"),
         pl.col("description"),
         pl.col("duration").str.strip_chars().cast(pl.Float32).alias("duration_secs")
     )
     
-    df_features = df_types.select(
-        pl.col("episode").str.contains(r"Game [1-7]").alias("about_playoff_game").cast(pl.Float32),
-        pl.col("episode").str.contains(r"H&D").alias("is_hollinger_duncan").cast(pl.Float32),
-        pl.col("episode").str.contains(r"Daily Duncs").alias("is_daily_dunc").cast(pl.Float32),
-        pl.col("episode").str.contains(r"Mock").alias("is_mock_episode").cast(pl.Float32),
-        pl.col("episode").str.contains(r"Awards").alias("is_awards_episode").cast(pl.Float32),
-        pl.col("date").dt.year().alias("year").cast(pl.Float32),
-        pl.col("date").dt.month().alias("month").cast(pl.Float32),
-        pl.col("date").dt.weekday().alias("weekday").cast(pl.Float32),
-        pl.col("date").dt.hour().alias("hour").cast(pl.Float32),
-        (pl.col("duration_secs") > 1800).alias("longer_thirty_min").cast(pl.Float32),
-        pl.col("duration_secs").cast(pl.Float32),
-        pl.col("episode").str.contains(r"Celtics").alias("description_contains_celtics").cast(pl.Float32),
-    ).drop_nulls()
+    engine = keyword_engine()
+    keyword_flags = engine.transform(df_types)
     
-    logger.info("Feature engineering completed")
-    return df_features
+    df_features = pl.concat([
+        df_types.select(
+            pl.col("guid"),
+            pl.col("date").dt.year().alias("year").cast(pl.Float32),
+            pl.col("date").dt.month().alias("month").cast(pl.Float32),
+            pl.col("date").dt.weekday().alias("weekday").cast(pl.Float32),
+            pl.col("date").dt.hour().alias("hour").cast(pl.Float32),
+            (pl.col("duration_secs") > 1800).alias("longer_thirty_min").cast(pl.Float32),
+            pl.col("duration_secs").cast(pl.Float32),
+        ),
+        pl.DataFrame(keyword_flags, schema=engine.feature_names, orient="row")
+    ], how="horizontal").drop_nulls().select(["guid"] + FEATURE_COLUMNS)
 
-def predict_bangers(features):
-    logger.info("Making predictions...")
+    if feature_store is not None:
+        # Dict lookup per guid against the memory-mapped store
+        embeddings = feature_store.lookup(df_features["guid"].to_list())
+        df_features = pl.concat(
+            [df_features, pl.DataFrame(embeddings, schema=feature_store.column_names, orient="row")],
+            how="horizontal"
+        )
+    
+    request_logger.info("Feature engineering completed")
+    return df_features if keep_guid else df_features.drop("guid")
+
+def model_uses_embeddings(model):
+    # Models trained with description embeddings take extra columns
+    n_model_features = model.session.get_inputs()[0].shape[1]
+    uses_embeddings = isinstance(n_model_features, int) and n_model_features > BASE_FEATURE_COUNT
+    if uses_embeddings and feature_store is None:
+        raise RuntimeError("Model expects description embeddings but FEATURE_STORE_DIR is not set")
+    return uses_embeddings
+
+def predict_bangers(features, session):
+    request_logger.info("Making predictions...")
     # Prepare features for ONNX model
     input_name = session.get_inputs()[0].name
-    pred_onx = session.run(None, {input_name: features})[1]
-    logger.info("Predictions completed")
-    return pred_onx
+    probabilities = session.run(None, {input_name: features})[1]
+    request_logger.info("Predictions completed")
+    # Older exports return a ZipMap (list of {label: prob} dicts), models from
+    # modeling_scripts/train_banger_model.py return an (n, 2) tensor ordered ['no', 'yes']
+    if isinstance(probabilities, list):
+        return [p["yes"] for p in probabilities]
+    return probabilities[:, 1]
 
 @app.route('/')
 def home():
-    logger.info("Homepage requested")
+    request_logger.info("Homepage requested")
     return render_template('index.html')
 
-@app.route('/predict')
-def predict():
-    logger.info("Prediction endpoint called")
-    try:
-       # Get recent episodes
-        episodes_df = get_recent_episodes()
+# Finished /predict payloads keyed by ETag. Entries depend on the model, so
+# they're dropped whenever the registry swaps in a new one.
+# Responses kept per ETag. 0 turns the response cache off, 304s and the
+# refresher's shared payload included, so every /predict runs features and
+# inference while the feed itself stays cached; load_test.py uses this to
+# measure inference.
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 8))
+_prediction_cache = {}
+model_registry.add_swap_listener(lambda active: _prediction_cache.clear())
+
+def _predict_cache_headers(response, etag, max_age):
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    # 304s must carry the same Vary as the 200 they revalidate (RFC 9110 15.4.5)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def recent_predictions(snapshot, recent_count, model, uses_embeddings):
+    """/predict rows for the newest `recent_count` episodes, highest probability first."""
+    with log_stage('features'):
+        # Get recent episodes
+        episodes_df = get_recent_episodes(snapshot, recent_count)
         
         # Retain episode and date for later
         episode_metadata = episodes_df.select(["episode", "date"])
         
         # Engineer features
-        features_df = engineer_features(episodes_df)
-        
+        features_df = engineer_features(episodes_df, feature_store if uses_embeddings else None)
+    
+    with log_stage('inference'):
         # Make predictions (exclude non-feature columns like 'episode' and 'date')
-        predictions = predict_bangers(features_df.to_numpy())
-        
-        # Combine results
-        results = []
-        for i, row in enumerate(features_df.iter_rows(named=True)):
-            results.append({
-                'episode': episode_metadata[i, "episode"],
-                'probability': float(round(predictions[i]["yes"], 2)),
-                'date': episode_metadata[i, "date"]
-            })
-        
-        # Sort by probability
-        results.sort(key=lambda x: x['probability'], reverse=True)
-        logger.info(f"Successfully processed {len(results)} episodes")
+        predictions = predict_bangers(features_df.to_numpy(), model.session)
+    
+    # Combine results
+    results = []
+    for i, row in enumerate(features_df.iter_rows(named=True)):
+        results.append({
+            'episode': episode_metadata[i, "episode"],
+            'probability': float(round(predictions[i], 2)),
+            'date': episode_metadata[i, "date"]
+        })
+    
+    # Sort by probability
+    results.sort(key=lambda x: x['probability'], reverse=True)
+    request_logger.info("Successfully processed %d episodes", len(results))
+    return results
+
+# How long a serving worker's /predict waits for the refresher to publish
+# the payload for a new feed before scoring it itself
+SHARED_PREDICTIONS_WAIT_SECONDS = 5.0
+
+def _shared_recent_predictions(model, store_version):
+    """
+    The refresher's published feed and (recent count, rows) for it, or None
+    when this worker has to score /predict itself: its model or feature
+    store differs from the refresher's, or the refresher hasn't caught up
+    with the latest feed within SHARED_PREDICTIONS_WAIT_SECONDS.
+    """
+    if shared_predictions is None or not PREDICTION_CACHE_SIZE:
+        return None
+    deadline = time.time() + SHARED_PREDICTIONS_WAIT_SECONDS
+    while True:
+        published_feed = shared_feed.read()
+        published = shared_predictions.read()
+        if published is not None:
+            if (published.model_sha256, published.feature_store_version) != (model.sha256, store_version):
+                return None
+            if published_feed is not None and published.feed_version == published_feed.version:
+                return published_feed, published.recent()
+        # Right after startup or a feed change, while the refresher scores
+        if time.time() >= deadline:
+            return None
+        time.sleep(0.05)
+
+@app.route('/predict')
+def predict():
+    request_logger.info("Prediction endpoint called")
+    # Pin one model for the whole request so a concurrent reload can't mix versions
+    model = model_registry.current()
+    try:
+        uses_embeddings = model_uses_embeddings(model)
+        if uses_embeddings:
+            # Serving workers don't embed; they remap the store when the
+            # refresher flushes new embeddings into it
+            feature_store.reload_if_changed()
+        store_version = feature_store.version if uses_embeddings else None
+
+        with log_stage('feed'):
+            shared = _shared_recent_predictions(model, store_version) if SERVING_ROLE == 'worker' else None
+            if shared is not None:
+                # Scored once by the refresher; this worker never parses the feed
+                snapshot, (recent_count, results) = shared
+            else:
+                snapshot = feed_cache.get()
+                recent_count = count_recent_episodes(snapshot)
+                results = None
+
+        # The payload is fully determined by the feed contents, the model,
+        # how many episodes are still inside the 7-day window and (for
+        # embedding models) which embeddings have landed in the store
+        etag = f'W/"{snapshot.version}-{model.sha256[:16]}-{recent_count}'
+        etag += f'-{store_version}"' if uses_embeddings else '"'
+        max_age = max(0, int(feed_cache.expires_in(snapshot)))
+        if PREDICTION_CACHE_SIZE and etag_matches(request.headers.get('If-None-Match'), etag):
+            not_modified = app.response_class(status=304)
+            # No body, so no body content type; the client keeps the cached one
+            del not_modified.headers['Content-Type']
+            return _predict_cache_headers(not_modified, etag, max_age)
+
+        if results is None:
+            results = _prediction_cache.get(etag)
+        if results is not None:
+            return _predict_cache_headers(jsonify(results), etag, max_age)
+
+        results = recent_predictions(snapshot, recent_count, model, uses_embeddings)
+        if PREDICTION_CACHE_SIZE:
+            if len(_prediction_cache) >= PREDICTION_CACHE_SIZE:
+                _prediction_cache.clear()
+            _prediction_cache[etag] = results
         
-        return jsonify(results)
+        return _predict_cache_headers(jsonify(results), etag, max_age)
     
     except Exception as e:
-        logger.error(f"Error in predict route: {str(e)}", exc_info=True)
+        logger.error("Error in predict route: %s", e, exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+# Every episode in the feed is scored whenever the feed or the model changes,
+# so /episodes can answer any date range straight from the store
+prediction_store = PredictionStore(os.environ.get('PREDICTION_STORE_DIR', 'prediction_store'))
+# One thread so scoring jobs run in order and never overlap
+_catalog_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='catalog')
+
+def score_catalog():
+    snapshot = feed_cache.peek()
+    if snapshot is None:
+        return
+    model = model_registry.current()
+    if prediction_store.model_sha256 == model.sha256 and prediction_store.feed_version == snapshot.version:
+        return
+
+    # After the early returns: the cold start model load triggers this
+    # before any feed is fetched, and polars should stay off the boot path
+    import polars as pl
+
+    start = time.perf_counter()
+    uses_embeddings = model_uses_embeddings(model)
+    episodes_df = get_recent_episodes(snapshot, len(snapshot.episodes)).unique(subset="guid", keep="first")
+    features_df = engineer_features(episodes_df, feature_store if uses_embeddings else None, keep_guid=True)
+    predictions = predict_bangers(features_df.drop("guid").to_numpy(), model.session)
+
+    # Join back on guid since engineer_features drops rows with missing fields
+    catalog_df = features_df.select("guid").with_columns(
+        pl.Series("probability", predictions, dtype=pl.Float32)
+    ).join(episodes_df.select("guid", "episode", "date"), on="guid").with_columns(
+        pl.col("date").str.strptime(pl.Datetime, format="%Y-%m-%dT%H:%M:%S%z").dt.epoch("s").alias("timestamp"),
+        classify_episode_type(pl.col("episode")).alias("type_code")
+    )
+    prediction_store.write(catalog_df, model.sha256, snapshot.version)
+    logger.info("Scored %d catalog episodes in %.3fs", catalog_df.height, time.perf_counter() - start)
+
+def _score_catalog_safely():
+    try:
+        score_catalog()
+    except Exception as e:
+        logger.error("Catalog scoring failed: %s", e, exc_info=True)
+
+def _load_catalog_safely():
+    try:
+        prediction_store.load()
+    except Exception as e:
+        logger.error("Catalog load failed: %s", e, exc_info=True)
+
+def build_catalog():
+    """Load the catalog a previous run left on disk, or score one if there is none."""
+    if prediction_store.version is not None or prediction_store.load():
+        return
+    # Scoring needs the model; in cold start mode its swap listener comes back here
+    if model_registry.active_sha256 is None:
+        return
+    feed_cache.get()
+    score_catalog()
+
+def _build_catalog_safely():
+    try:
+        build_catalog()
+    except Exception as e:
+        logger.error("Catalog build failed: %s", e, exc_info=True)
+
+# Rescore the catalog whenever the feed or model changes. load_test.py turns
+# this off so its numbers only cover request work; the first catalog is
+# still built at boot.
+CATALOG_AUTO_SCORE = os.environ.get('CATALOG_AUTO_SCORE', '1') == '1'
+
+def publish_recent_predictions():
+    """
+    Refresher process: score the /predict payload for the current feed,
+    model and feature store and publish it to the serving workers, unless
+    it's already published.
+    """
+    snapshot = feed_cache.peek()
+    # In cold start mode the model's swap listener schedules this once it loads
+    if snapshot is None or model_registry.active_sha256 is None:
+        return
+    model = model_registry.current()
+    uses_embeddings = model_uses_embeddings(model)
+    store_version = feature_store.version if uses_embeddings else None
+    published = shared_predictions.read()
+    if published is not None and (published.feed_version, published.model_sha256,
+                                  published.feature_store_version) == (snapshot.version, model.sha256, store_version):
+        return
+
+    recent_count = count_recent_episodes(snapshot)
+    results = recent_predictions(snapshot, recent_count, model, uses_embeddings)
+    shared_predictions.publish(PublishedPredictions(
+        feed_version=snapshot.version,
+        model_sha256=model.sha256,
+        feature_store_version=store_version,
+        window=[int(episode['pub_date'].timestamp()) for episode in snapshot.episodes[:recent_count]],
+        episodes=results,
+        timestamps=[int(datetime.fromisoformat(result['date']).timestamp()) for result in results],
+    ))
+    logger.info("Published /predict payload for feed %s, model %s", snapshot.version, model.sha256[:12])
+
+def _publish_recent_predictions_safely():
+    try:
+        publish_recent_predictions()
+    except Exception as e:
+        logger.error("Publishing /predict payload failed: %s", e, exc_info=True)
+
+def schedule_rescoring():
+    """Rescore /predict (refresher only) and the catalog after the feed or model changed."""
+    if SERVING_ROLE == 'refresher' and PREDICTION_CACHE_SIZE:
+        # First, since serving workers answer /predict from it
+        _catalog_executor.submit(_publish_recent_predictions_safely)
+    # Serving workers only pick up what the refresher process scored
+    if SERVING_ROLE == 'worker':
+        _catalog_executor.submit(_load_catalog_safely)
+    elif prediction_store.version is None:
+        _catalog_executor.submit(_build_catalog_safely)
+    elif CATALOG_AUTO_SCORE:
+        _catalog_executor.submit(_score_catalog_safely)
+
+def _refresh_feed_safely():
+    try:
+        feed_cache.get()
+    except Exception as e:
+        logger.error("Background feed refresh failed: %s", e, exc_info=True)
+
+def _wait_for_refresher_catalog():
+    # Serving workers never score; they pick up the refresher's first catalog
+    while True:
+        try:
+            if prediction_store.load():
+                return
+        except Exception as e:
+            logger.error("Catalog load failed: %s", e, exc_info=True)
+        time.sleep(0.5)
+
+# How often a serving worker checks whether the refresher wrote a newer
+# catalog, and how often a failed boot build is retried
+CATALOG_POLL_SECONDS = float(os.environ.get('CATALOG_POLL_SECONDS', 5))
+_catalog_checked_at = 0.0
+
+def _poll_catalog():
+    global _catalog_checked_at
+    if time.time() - _catalog_checked_at >= CATALOG_POLL_SECONDS:
+        _catalog_checked_at = time.time()
+        _catalog_executor.submit(_load_catalog_safely if SERVING_ROLE == 'worker' else _build_catalog_safely)
+
+model_registry.add_swap_listener(lambda active: schedule_rescoring())
+# Build the catalog at boot so no /episodes request fetches or scores it. If
+# the model finished loading before the listener was added, this covers it;
+# a second submit returns early.
+_catalog_executor.submit(_wait_for_refresher_catalog if SERVING_ROLE == 'worker' else _build_catalog_safely)
+
+# Query params: start/end (ISO dates, end exclusive), type (one of
+# prediction_store.EPISODE_TYPES), sort=date|probability (top-k is
+# sort=probability&limit=k), limit (<= 100) and cursor (next_cursor from the
+# previous page)
+@app.route('/episodes')
+def episodes():
+    try:
+        if prediction_store.version is None:
+            # Built at boot (workers wait for the refresher's); retry a
+            # failed build here
+            if SERVING_ROLE != 'worker':
+                _poll_catalog()
+            response = jsonify({'error': 'Episode catalog is not ready yet, retry shortly'})
+            response.headers['Retry-After'] = str(math.ceil(CATALOG_POLL_SECONDS))
+            return response, 503
+        if SERVING_ROLE == 'worker':
+            # Off the request path, like the feed refresh below
+            _poll_catalog()
+        else:
+            snapshot = feed_cache.peek()
+            if snapshot is None or feed_cache.expires_in(snapshot) <= 0:
+                # Refresh off the request path; a changed feed triggers rescoring
+                _catalog_executor.submit(_refresh_feed_safely)
+
+        with log_stage('query'):
+            page = prediction_store.query(
+                start=parse_query_time(request.args.get('start')),
+                end=parse_query_time(request.args.get('end')),
+                episode_type=request.args.get('type'),
+                sort=request.args.get('sort', 'date'),
+                limit=int(request.args.get('limit', 20)),
+                cursor=request.args.get('cursor')
+            )
+        return jsonify(page)
+
+    except StaleCursorError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error("Error in episodes route: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
+# Seconds between retries when the refresher's upstream fetch fails
+FEED_RETRY_SECONDS = 5.0
+
+def run_refresher():
+    """
+    Main loop of prefork.py's refresher process: refetch the feed on
+    schedule, publishing each fetch to the serving workers, and rescore
+    /predict and the catalog whenever the feed or model changes. Never
+    returns.
+    """
+    logger.info("Refresher started, fetching every %ss", FEED_REFRESH_SECONDS)
+    while True:
+        _refresh_feed_safely()
+        if PREDICTION_CACHE_SIZE:
+            # Also catches embeddings flushed into the feature store since
+            # the last pass; a payload that's still current isn't rescored
+            _catalog_executor.submit(_publish_recent_predictions_safely)
+        snapshot = feed_cache.peek()
+        wait = feed_cache.expires_in(snapshot) if snapshot is not None else 0
+        time.sleep(wait if wait > 0 else FEED_RETRY_SECONDS)
+
 def main():
     # Environment setup
     env = os.environ.get('FLASK_ENV', 'production')
@@ -223,16 +773,26 @@ def main():
     required_vars = ['RSS_FEED_URL']
     missing_vars = [var for var in required_vars if not os.environ.get(var)]
     if missing_vars:
-        logger.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing_vars))
         raise SystemExit("Missing required environment variables")
     
-    logger.info(f"Starting server in {env} mode on port {port}")
+    logger.info("Starting server in %s mode on port %d", env, port)
+    if not COLD_START_MODE:
+        log_startup_timings()
     
     if env == 'development':
+        if COLD_START_MODE:
+            start_background_model_load()
         app.run(debug=True, host=host, port=port)
     else:
         # Production server (Waitress)
-        serve(app, host=host, port=port, threads=4)
+        from waitress import create_server
+        server = create_server(app, host=host, port=port, threads=int(os.environ.get('WAITRESS_THREADS', 4)))
+        if COLD_START_MODE:
+            # The port is bound, so the model load no longer delays /health
+            start_background_model_load()
+        server.print_listen("Serving on http://{}:{}")
+        server.run()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,256 @@
+"""
+Precomputed description embeddings keyed by episode guid.
+
+Store layout (one directory, written by write_store here or by
+feature_eng_scripts/create_embeddings.py):
+
+    guids.json       list of episode guids, row i of the matrices below
+    embeddings.npy   float32 [n, dim], or int8 [n, dim] when quantized
+    scales.npy       float32 [n] per-row dequantization scales (int8 only)
+
+The matrices are memory-mapped, so loading is cheap and worker processes
+share the pages through the OS page cache. Processes that don't embed
+(prefork.py's serving workers) pick up another process's writes with
+reload_if_changed().
+
+Fallback while an embedding is pending: episodes that aren't in the store
+yet (typically published since the last batch run, with ingest embedding
+still in flight or disabled) get the centroid of all stored embeddings. The
+centroid is the least-informative vector the model has seen during
+training, so predictions for new episodes degrade to roughly the
+title/date/duration-only signal instead of failing or stalling the request.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger('duncd_on_app')
+
+
+def quantize_rows(embeddings: np.ndarray):
+    """
+    Symmetric per-row int8 quantization.
+
+    Returns:
+        Tuple of the int8 matrix and the float32 scale for each row
+    """
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.clip(np.round(embeddings / scales[:, None]), -127, 127).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def write_store(directory: str, guids: Sequence[str], embeddings: np.ndarray, quantize: bool = False):
+    """
+    Write a store directory, replacing each file atomically.
+
+    Readers that already memory-mapped the old files keep a consistent view
+    until they reload.
+    """
+    os.makedirs(directory, exist_ok=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    arrays = {}
+    if quantize:
+        arrays['embeddings.npy'], arrays['scales.npy'] = quantize_rows(embeddings)
+    else:
+        arrays['embeddings.npy'] = embeddings
+
+    for name, array in arrays.items():
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(directory, name))
+    if not quantize and os.path.exists(os.path.join(directory, 'scales.npy')):
+        os.remove(os.path.join(directory, 'scales.npy'))
+
+    tmp_path = os.path.join(directory, '.guids.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(list(guids), f)
+    os.replace(tmp_path, os.path.join(directory, 'guids.json'))
+
+
+class EmbeddingFeatureStore:
+    """
+    O(1) guid -> embedding lookups for the serving path.
+
+    Embeddings computed after load (see schedule_missing) live in an
+    in-memory overlay until flush() folds them into the on-disk store, which
+    happens whenever the embedding queue drains. Episodes embedded once are
+    then not embedded again after a restart.
+    """
+
+    def __init__(self, directory: str, embed: Optional[Callable[[str], np.ndarray]] = None):
+        """
+        Args:
+            directory: Store directory (see module docstring for the layout)
+            embed: Turns a description into a float32 vector. When None,
+                missing episodes stay on the fallback vector.
+        """
+        self.directory = directory
+        self._embed = embed
+        self._overlay: Dict[str, np.ndarray] = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='embed') if embed else None
+        # Bumped whenever lookups could return different vectors, so
+        # response caches keyed on it notice newly embedded episodes
+        self.version = 0
+        self._signature = None
+        self._load()
+
+    def _store_signature(self):
+        # write_store replaces guids.json last, so it changing means the
+        # matrices have been replaced too
+        stat = os.stat(os.path.join(self.directory, 'guids.json'))
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        # Taken before reading, so a write landing mid-load is seen as a
+        # change on the next reload_if_changed()
+        self._signature = self._store_signature()
+        with open(os.path.join(self.directory, 'guids.json')) as f:
+            guids = json.load(f)
+        # Matrices before the index: flush() only appends rows, so a lookup
+        # racing a reload sees either index against the new matrices
+        self._embeddings = np.load(os.path.join(self.directory, 'embeddings.npy'), mmap_mode='r')
+        scales_path = os.path.join(self.directory, 'scales.npy')
+        self._scales = np.load(scales_path, mmap_mode='r') if self._embeddings.dtype == np.int8 else None
+        self.dim = self._embeddings.shape[1]
+
+        if len(guids):
+            self.fallback = self._rows(np.arange(len(guids))).mean(axis=0).astype(np.float32)
+        else:
+            self.fallback = np.zeros(self.dim, dtype=np.float32)
+        self._index = {guid: row for row, guid in enumerate(guids)}
+        self.version += 1
+        logger.info("Loaded %d description embeddings (dim=%d, %s) from %s", len(guids), self.dim,
+                    'int8' if self._scales is not None else 'float32', self.directory)
+
+    def _rows(self, rows: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(self._embeddings[rows], dtype=np.float32)
+        if self._scales is not None:
+            matrix *= np.asarray(self._scales[rows], dtype=np.float32)[:, None]
+        return matrix
+
+    @property
+    def column_names(self) -> List[str]:
+        return [f"description_embedding_{i}" for i in range(self.dim)]
+
+    def lookup(self, guids: Sequence[str]) -> np.ndarray:
+        """
+        Return a float32 [len(guids), dim] matrix, using the fallback for
+        episodes without an embedding yet.
+        """
+        out = np.empty((len(guids), self.dim), dtype=np.float32)
+        positions, rows = [], []
+        for position, guid in enumerate(guids):
+            row = self._index.get(guid)
+            if row is not None:
+                positions.append(position)
+                rows.append(row)
+            else:
+                out[position] = self._overlay.get(guid, self.fallback)
+        if rows:
+            out[positions] = self._rows(np.asarray(rows))
+        return out
+
+    def reload_if_changed(self) -> bool:
+        """
+        Remap the store if another process rewrote it since the last load
+        (the refresher's flush, or a batch create_embeddings.py run).
+
+        Costs one stat() when the files haven't changed.
+
+        Returns:
+            bool: Whether the store was reloaded (and version bumped)
+        """
+        signature = self._store_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            # A flush in this process may have loaded it while we waited
+            if signature == self._signature:
+                return False
+            self._load()
+            return True
+
+    def has(self, guid: str) -> bool:
+        return guid in self._index or guid in self._overlay
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def schedule_missing(self, episodes: Iterable[dict]):
+        """
+        Queue embedding jobs for episodes not in the store. Returns immediately;
+        lookups use the fallback until each job finishes.
+        """
+        if self._executor is None:
+            return
+        with self._lock:
+            for episode in episodes:
+                guid = episode['guid']
+                if self.has(guid) or guid in self._pending:
+                    continue
+                self._pending.add(guid)
+                self._executor.submit(self._embed_one, guid, episode.get('description') or '')
+
+    def _embed_one(self, guid: str, description: str):
+        try:
+            vector = np.asarray(self._embed(description), dtype=np.float32)
+            if vector.shape != (self.dim,):
+                raise ValueError(f"Embedding has shape {vector.shape}, store expects ({self.dim},)")
+            self._overlay[guid] = vector
+            self.version += 1
+        except Exception as e:
+            logger.error("Embedding failed for episode %s: %s", guid, e, exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard(guid)
+                drained = not self._pending
+        if drained:
+            try:
+                self.flush()
+            except Exception as e:
+                # The overlay is kept, so the next drain retries the write
+                logger.error("Feature store flush failed: %s", e, exc_info=True)
+
+    def flush(self, quantize: Optional[bool] = None):
+        """Fold the overlay into the on-disk store and remap it."""
+        with self._lock:
+            if not self._overlay:
+                return
+            flushed = list(self._overlay.items())
+            guids = list(self._index) + [guid for guid, _ in flushed]
+            matrix = np.vstack([self._rows(np.arange(len(self._index))), np.stack([vector for _, vector in flushed])])
+            if quantize is None:
+                quantize = self._scales is not None
+            write_store(self.directory, guids, matrix, quantize=quantize)
+            self._load()
+            logger.info("Flushed %d ingest embeddings to %s", len(flushed), self.directory)
+            # Keep anything embedded while we were writing for the next flush
+            for guid, _ in flushed:
+                self._overlay.pop(guid, None)
+
+
+def modernbert_embedder():
+    """
+    Build the same mean-pooled ModernBERT embedder as create_embeddings.py.
+
+    Requires transformers (not part of the serving image by default).
+    """
+    from transformers import pipeline
+
+    embedding_pipeline = pipeline('feature-extraction', model='answerdotai/ModernBERT-base',
+                                  tokenizer='answerdotai/ModernBERT-base')
+
+    def embed(text: str) -> np.ndarray:
+        return np.asarray(embedding_pipeline(text)[0], dtype=np.float32).mean(axis=0)
+
+    return embed
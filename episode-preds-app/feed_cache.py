@@ -0,0 +1,76 @@
+import hashlib
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+
+def feed_version(content: bytes) -> str:
+    """Content hash of the raw feed bytes, used as the snapshot version."""
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+class FeedSnapshot(NamedTuple):
+    """One fetch of the RSS feed, parsed once and shared by all requests."""
+    episodes: List[dict]  # every episode in the feed, newest first
+    version: str  # content hash of the raw feed, changes only when the feed does
+    fetched_at: float
+
+
+class FeedCache:
+    """
+    Keeps the parsed RSS feed in memory and refetches it at most once per
+    refresh interval.
+
+    Concurrent requests that find the snapshot stale wait on a single fetch
+    instead of each hitting the upstream feed.
+    """
+
+    def __init__(self, fetch: Callable[[], bytes], parse: Callable[[bytes], List[dict]],
+                 refresh_interval: float,
+                 on_new_version: Optional[Callable[['FeedSnapshot'], None]] = None):
+        """
+        Args:
+            fetch: Returns the raw feed bytes, raising on failure
+            parse: Turns raw feed bytes into a list of episode dicts
+            refresh_interval: Seconds a snapshot is served before refetching
+            on_new_version: Called with the new snapshot whenever the feed
+                contents change. Runs on the refreshing request's thread, so
+                it should hand heavy work off elsewhere.
+        """
+        self._fetch = fetch
+        self._parse = parse
+        self._on_new_version = on_new_version
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[FeedSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> FeedSnapshot:
+        """Return the current snapshot, refreshing it first if it has expired."""
+        snapshot = self._snapshot
+        if snapshot is not None and self.expires_in(snapshot) > 0:
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited on the lock
+            snapshot = self._snapshot
+            if snapshot is not None and self.expires_in(snapshot) > 0:
+                return snapshot
+
+            content = self._fetch()
+            version = feed_version(content)
+            changed = snapshot is None or snapshot.version != version
+            # Unchanged upstream, skip reparsing
+            episodes = self._parse(content) if changed else snapshot.episodes
+
+            self._snapshot = FeedSnapshot(episodes, version, time.time())
+            if changed and self._on_new_version is not None:
+                self._on_new_version(self._snapshot)
+            return self._snapshot
+
+    def peek(self) -> Optional[FeedSnapshot]:
+        """Return the last snapshot without refreshing, or None before the first fetch."""
+        return self._snapshot
+
+    def expires_in(self, snapshot: FeedSnapshot) -> float:
+        """Seconds until `snapshot` is due for a refresh (negative once expired)."""
+        return snapshot.fetched_at + self.refresh_interval - time.time()
@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import os
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is used when brotli isn't installed
+    brotli = None
+
+# Bodies smaller than this aren't worth the compression overhead
+MIN_COMPRESS_BYTES = 500
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+# Fingerprinted static URLs never change content, so browsers can keep them for a year
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_static_fingerprints: Dict[str, str] = {}
+_compressed_static: Dict[Tuple[str, str, str], bytes] = {}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against our ETag.
+
+    Args:
+        if_none_match: Raw header value, possibly a comma separated list or '*'
+        etag: Our quoted ETag, with or without the W/ prefix
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    ours = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == ours:
+            return True
+    return False
+
+
+def static_fingerprint(static_folder: str, filename: str) -> str:
+    """
+    Content hash of a static file, computed once per process.
+
+    Static files only change with a deploy, which restarts the process, so
+    the hash is cached for the lifetime of the worker.
+    """
+    fingerprint = _static_fingerprints.get(filename)
+    if fingerprint is None:
+        digest = hashlib.sha256()
+        with open(os.path.join(static_folder, filename), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        fingerprint = digest.hexdigest()[:12]
+        _static_fingerprints[filename] = fingerprint
+    return fingerprint
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, preferring brotli."""
+    offered = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+
+    if brotli is not None and offered.get('br', 0) > 0:
+        return 'br'
+    if offered.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def compress_response(response, accept_encoding: str, static_key: Optional[str] = None):
+    """
+    Compress a response body in place when the client and content allow it.
+
+    Args:
+        response: Flask response from an after_request hook
+        accept_encoding: The request's Accept-Encoding header
+        static_key: For static files, a key (path + fingerprint) under which
+            the compressed bytes are memoized so each asset is compressed once
+
+    Returns:
+        The same response, possibly with a compressed body
+    """
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding or '')
+    if encoding is None:
+        return response
+
+    cache_key = (static_key, encoding, response.mimetype) if static_key else None
+    compressed = _compressed_static.get(cache_key) if cache_key else None
+    if compressed is None:
+        # Static files are streamed from disk by default; read them so we can compress
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return response
+        compressed = _compress(data, encoding)
+        if cache_key:
+            _compressed_static[cache_key] = compressed
+    else:
+        response.direct_passthrough = False
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
+    return response
@@ -0,0 +1,218 @@
+"""
+Single-pass keyword flags for episode titles and descriptions.
+
+Every pattern in the vocabulary is compiled into one Aho-Corasick automaton
+per text field, and all rows of a field are scanned in a single pass, so
+the cost barely grows with the number of keyword features. The matrix comes
+back as dense float32 in vocabulary order, ready to feed the ONNX model.
+
+Vocabulary files are JSON lists of
+{"name": ..., "field": "episode" | "description", "patterns": [...]}.
+Patterns are literal substrings; a regex like "Game [1-7]" is written out
+as its seven literals.
+
+pyahocorasick is a requirement; without it each feature becomes one
+polars str.contains_any, which is as fast for a handful of features but
+scales with the vocabulary size.
+
+numpy is imported when the first engine is built, so the vocabulary and
+feature layout can be read without it on the app's startup path.
+"""
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # Listed in requirements; _PolarsMatcher below is the fallback
+    ahocorasick = None
+
+FIELDS = ('episode', 'description')
+
+
+class KeywordFeature(NamedTuple):
+    name: str
+    field: str
+    patterns: Tuple[str, ...]
+
+
+# The flags the served model was trained on, in model column order
+DEFAULT_VOCABULARY = [
+    KeywordFeature('about_playoff_game', 'episode', tuple(f'Game {n}' for n in range(1, 8))),
+    KeywordFeature('is_hollinger_duncan', 'episode', ('H&D',)),
+    KeywordFeature('is_daily_dunc', 'episode', ('Daily Duncs',)),
+    KeywordFeature('is_mock_episode', 'episode', ('Mock',)),
+    KeywordFeature('is_awards_episode', 'episode', ('Awards',)),
+    # The name is historical: the trained model's Celtics flag has always
+    # been computed from the title, so it stays on the title for parity
+    KeywordFeature('description_contains_celtics', 'episode', ('Celtics',)),
+]
+
+
+# Non-keyword model inputs, built from the publish date and duration
+NUMERIC_FEATURES = ['year', 'month', 'weekday', 'hour', 'longer_thirty_min', 'duration_secs']
+
+# Keyword flags that sit before NUMERIC_FEATURES in the model input
+_LEADING_KEYWORDS = [feature.name for feature in DEFAULT_VOCABULARY[:5]]
+
+
+def feature_layout(keyword_names: Sequence[str]) -> List[str]:
+    """
+    Model input column order for a vocabulary.
+
+    The original five title flags come first, then NUMERIC_FEATURES, then
+    every other keyword in vocabulary order. For DEFAULT_VOCABULARY this is
+    exactly the 12-column layout the served model was trained on.
+    """
+    return ([name for name in _LEADING_KEYWORDS if name in keyword_names]
+            + NUMERIC_FEATURES
+            + [name for name in keyword_names if name not in _LEADING_KEYWORDS])
+
+
+def load_vocabulary(path: str) -> List[KeywordFeature]:
+    """Read a JSON vocabulary file (see module docstring for the format)."""
+    with open(path) as f:
+        entries = json.load(f)
+    vocabulary = [KeywordFeature(entry['name'], entry['field'], tuple(entry['patterns'])) for entry in entries]
+    validate_vocabulary(vocabulary)
+    return vocabulary
+
+
+def validate_vocabulary(vocabulary: Sequence[KeywordFeature]):
+    names = [feature.name for feature in vocabulary]
+    if len(set(names)) != len(names):
+        raise ValueError("Keyword feature names must be unique")
+    for feature in vocabulary:
+        if feature.field not in FIELDS:
+            raise ValueError(f"Keyword feature {feature.name} has unknown field '{feature.field}'")
+        if not feature.patterns or any(not pattern for pattern in feature.patterns):
+            raise ValueError(f"Keyword feature {feature.name} needs at least one non-empty pattern")
+        if any('\x00' in pattern for pattern in feature.patterns):
+            raise ValueError(f"Keyword feature {feature.name} has a pattern containing NUL")
+
+
+class _NativeMatcher:
+    """
+    One pyahocorasick automaton over all of a field's rows at once.
+
+    The rows are joined with NUL separators into a single string, so the
+    scan is one C call per field; only actual matches come back to Python,
+    and they are mapped to rows and features with numpy.
+    """
+
+    def __init__(self, patterns: Dict[str, Tuple[int, ...]]):
+        import numpy as np
+
+        self._automaton = ahocorasick.Automaton()
+        # Feature ids for every pattern, flattened CSR style: pattern i owns
+        # _feature_ids[_offsets[i]:_offsets[i + 1]]
+        feature_ids: List[int] = []
+        offsets = [0]
+        for pattern_id, (pattern, ids) in enumerate(patterns.items()):
+            self._automaton.add_word(pattern, pattern_id)
+            feature_ids.extend(ids)
+            offsets.append(len(feature_ids))
+        self._automaton.make_automaton()
+        self._feature_ids = np.array(feature_ids, dtype=np.intp)
+        self._offsets = np.array(offsets, dtype=np.intp)
+
+    def flag(self, df, column, flags: np.ndarray):
+        """Set flags[row, feature] for every match of the `column` expression over `df`."""
+        import numpy as np
+
+        texts = df.select(column.fill_null('')).to_series().to_list()
+        # Patterns never contain NUL (validate_vocabulary), so no match can
+        # span two rows; each row's end offset locates the row of a match
+        row_ends = np.cumsum(np.fromiter((len(text) + 1 for text in texts), dtype=np.intp, count=len(texts)))
+        hits = np.fromiter((value for match in self._automaton.iter('\x00'.join(texts)) for value in match),
+                           dtype=np.intp).reshape(-1, 2)
+        if not len(hits):
+            return
+        rows = np.searchsorted(row_ends, hits[:, 0], side='right')
+        starts = self._offsets[hits[:, 1]]
+        counts = self._offsets[hits[:, 1] + 1] - starts
+        # Expand each match to every feature its pattern belongs to
+        ends = np.cumsum(counts)
+        positions = np.arange(ends[-1]) - np.repeat(ends - counts, counts) + np.repeat(starts, counts)
+        flags[np.repeat(rows, counts), self._feature_ids[positions]] = 1.0
+
+
+class _PolarsMatcher:
+    """
+    Fallback without pyahocorasick: one polars str.contains_any per feature,
+    evaluated column-wise.
+    """
+
+    def __init__(self, patterns: Dict[str, Tuple[int, ...]]):
+        by_feature: Dict[int, List[str]] = {}
+        for pattern, ids in patterns.items():
+            for feature_id in ids:
+                by_feature.setdefault(feature_id, []).append(pattern)
+        self._patterns = by_feature
+
+    def flag(self, df, column, flags: np.ndarray):
+        # One select, so polars evaluates the features side by side
+        matched = df.select(
+            column.str.contains_any(patterns).fill_null(False).alias(str(feature_id))
+            for feature_id, patterns in self._patterns.items()
+        )
+        flags[:, list(self._patterns)] = matched.to_numpy()
+
+
+class KeywordFeatureEngine:
+    """Compiles a keyword vocabulary once and flags many texts against it."""
+
+    def __init__(self, vocabulary: Sequence[KeywordFeature] = DEFAULT_VOCABULARY, case_sensitive: bool = True):
+        """
+        Args:
+            vocabulary: Keyword features; output columns follow this order
+            case_sensitive: Match case exactly (the trained model's flags do)
+        """
+        validate_vocabulary(vocabulary)
+        self.vocabulary = list(vocabulary)
+        self.case_sensitive = case_sensitive
+
+        matcher_class = _NativeMatcher if ahocorasick is not None else _PolarsMatcher
+        self._matchers = {}
+        for field in FIELDS:
+            patterns: Dict[str, Tuple[int, ...]] = {}
+            for feature_id, feature in enumerate(self.vocabulary):
+                if feature.field != field:
+                    continue
+                for pattern in feature.patterns:
+                    key = pattern if case_sensitive else pattern.lower()
+                    patterns[key] = patterns.get(key, ()) + (feature_id,)
+            if patterns:
+                self._matchers[field] = matcher_class(patterns)
+
+    @property
+    def feature_names(self) -> List[str]:
+        return [feature.name for feature in self.vocabulary]
+
+    def transform(self, df) -> np.ndarray:
+        """
+        Flag every row against the whole vocabulary.
+
+        Args:
+            df: polars DataFrame with a string column per field the
+                vocabulary uses ('episode', 'description'). Nulls count as
+                empty strings.
+
+        Returns:
+            np.ndarray: float32 [n_rows, n_features], 1.0 where a feature matched
+        """
+        import numpy as np
+        import polars as pl
+
+        flags = np.zeros((df.height, len(self.vocabulary)), dtype=np.float32)
+        if not df.height or not self._matchers:
+            return flags
+
+        for field, matcher in self._matchers.items():
+            column = pl.col(field) if self.case_sensitive else pl.col(field).str.to_lowercase()
+            matcher.flag(df, column, flags)
+        return flags
@@ -0,0 +1,386 @@
+"""
+Load test the prediction service across waitress and onnxruntime thread counts.
+
+Serves a synthetic RSS feed from a local stand-in server, starts app.py once
+per configuration and drives it with a weighted request mix, then reports
+throughput, latency percentiles, error rate and CPU use per configuration:
+
+    python load_test.py --threads 1,2,4,8 --ort-threads 1,2 --concurrency 16 --duration 20
+
+The app's /predict response cache is off (PREDICTION_CACHE_SIZE=0), so
+every /predict runs feature engineering and inference against the cached
+feed, which is what the --ort-threads sweep needs. Pass --response-cache to
+measure cached responses instead, and --bust-cache with
+--feed-refresh-seconds 0 to include a feed fetch and parse in every
+request (these serialize on the feed cache's refresh lock).
+
+Catalog rescoring (which every new feed version would otherwise trigger in
+the background) is off so the numbers only cover request work; pass
+--score-catalog to include it.
+
+--workers 1,2,4 also sweeps multi-process serving (prefork.py). The report
+then shows upstream feed fetches per minute, which should not grow with the
+worker count, and the proportional memory (PSS) of the largest process,
+which should stay flat.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TITLE_TEMPLATES = [
+    "Daily Duncs: {team} news",
+    "H&D: {team} deep dive",
+    "{team} vs. Celtics Game {game} recap",
+    "Mock Draft {n}.0",
+    "Awards show predictions with {team}",
+    "Big picture: where do the {team} go from here?",
+]
+TEAMS = ["Knicks", "Thunder", "Nuggets", "Pacers", "Warriors", "Lakers", "Magic", "Cavaliers"]
+
+
+def build_feed(n_episodes: int, seed: int, nonce: str = '') -> bytes:
+    """
+    Generate an RSS document shaped like the real feed.
+
+    Args:
+        n_episodes: Number of items; the first few fall inside the 7-day window
+        seed: Random seed so every configuration sees the same episodes
+        nonce: Extra text in the channel description to force a new feed version
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    items = []
+    for i in range(n_episodes):
+        title = rng.choice(TITLE_TEMPLATES).format(team=rng.choice(TEAMS), game=rng.randint(1, 7), n=i)
+        pub_date = (now - timedelta(hours=6 * i + rng.randint(0, 5))).strftime('%a, %d %b %Y %H:%M:%S %z')
+        items.append(
+            f"<item><guid>episode-{i}</guid><title>{escape(title)}</title>"
+            f"<description>Nate and Danny talk about the {rng.choice(TEAMS)}.</description>"
+            f"<pubDate>{pub_date}</pubDate><itunes:duration>{rng.randint(900, 6000)}</itunes:duration></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd"><channel>'
+        f"<title>Stand-in feed</title><description>{nonce}</description>{''.join(items)}"
+        '</channel></rss>'
+    ).encode()
+
+
+def start_feed_server(n_episodes: int, seed: int, bust_cache: bool) -> ThreadingHTTPServer:
+    """Serve the synthetic feed on a free localhost port in a daemon thread."""
+    static_feed = build_feed(n_episodes, seed)
+    counter = itertools.count()
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            fetch_number = next(counter)
+            self.server.fetches = fetch_number + 1
+            body = build_feed(n_episodes, seed, nonce=str(fetch_number)) if bust_cache else static_feed
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    server.fetches = 0
+    threading.Thread(target=server.serve_forever, name='feed-server', daemon=True).start()
+    return server
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    """`pid` and all of its descendants, e.g. prefork.py and its workers."""
+    pids = [pid]
+    for parent in pids:
+        try:
+            with open(f"/proc/{parent}/task/{parent}/children") as f:
+                pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _pss_mb(pid: int) -> Optional[float]:
+    """Proportional set size: shared pages are split between the processes mapping them."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time of a process from /proc, or None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime are fields 14 and 15; fields[0] here is field 3
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def start_app(port: int, feed_url: str, waitress_threads: int, ort_threads: int,
+              feed_refresh_seconds: float, workers: int = 1, *, store_dir: str,
+              score_catalog: bool = False, response_cache: bool = False) -> subprocess.Popen:
+    """
+    Start app.py (or prefork.py with `workers` > 1) with the given thread
+    settings and wait until /health answers.
+
+    Args:
+        store_dir: PREDICTION_STORE_DIR for the app; the caller cleans it up
+        score_catalog: Let the app rescore the catalog on every feed change
+        response_cache: Keep the app's /predict response cache on
+    """
+    env = {
+        **os.environ,
+        'PORT': str(port),
+        'HOST': '127.0.0.1',
+        'FLASK_ENV': 'production',
+        'COLD_START_MODE': '0',
+        'RSS_FEED_URL': feed_url,
+        'FEED_REFRESH_SECONDS': str(feed_refresh_seconds),
+        'WAITRESS_THREADS': str(waitress_threads),
+        'ORT_INTRA_OP_THREADS': str(ort_threads),
+        'ORT_INTER_OP_THREADS': '1',
+        'PREDICTION_STORE_DIR': store_dir,
+        'CATALOG_AUTO_SCORE': '1' if score_catalog else '0',
+        'PREDICTION_CACHE_SIZE': os.environ.get('PREDICTION_CACHE_SIZE', '8') if response_cache else '0',
+        'WEB_WORKERS': str(workers),
+    }
+    proc = subprocess.Popen([sys.executable, 'prefork.py' if workers > 1 else 'app.py'], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app.py exited with code {proc.returncode} during startup")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError("app.py did not become healthy within 60s")
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def drive_load(port: int, mix: Dict[str, float], concurrency: int, duration: float, seed: int) -> dict:
+    """
+    Run `concurrency` keep-alive clients for `duration` seconds.
+
+    Returns:
+        dict: Request count, errors and latencies (seconds) overall and per path
+    """
+    paths = list(mix)
+    weights = [mix[path] for path in paths]
+    stop_at = time.perf_counter() + duration
+    results = []
+    lock = threading.Lock()
+
+    def client(worker_id: int):
+        rng = random.Random(seed + worker_id)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local = []
+        while time.perf_counter() < stop_at:
+            path = rng.choices(paths, weights)[0]
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Accept-Encoding': 'gzip, br'})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            local.append((path, time.perf_counter() - start, ok))
+        conn.close()
+        with lock:
+            results.extend(local)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    def summarize(samples):
+        latencies = sorted(latency for _, latency, _ in samples)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'p50_ms': (_percentile(latencies, 50) or 0) * 1000,
+            'p95_ms': (_percentile(latencies, 95) or 0) * 1000,
+            'p99_ms': (_percentile(latencies, 99) or 0) * 1000,
+        }
+
+    return {
+        'overall': summarize(results),
+        'by_path': {path: summarize([r for r in results if r[0] == path]) for path in paths},
+    }
+
+
+def _tree_cpu_seconds(pids: List[int]) -> Optional[float]:
+    seconds = [_cpu_seconds(pid) for pid in pids]
+    return sum(seconds) if all(value is not None for value in seconds) else None
+
+
+def run_configuration(feed_server: ThreadingHTTPServer, feed_url: str, workers: int, waitress_threads: int,
+                      ort_threads: int, args) -> dict:
+    """Start one app configuration, warm it up, load it and collect CPU, memory and upstream fetches."""
+    port = _free_port()
+    store_dir = tempfile.mkdtemp(prefix='loadtest_store_')
+    proc = None
+    try:
+        proc = start_app(port, feed_url, waitress_threads, ort_threads, args.feed_refresh_seconds, workers,
+                         store_dir=store_dir, score_catalog=args.score_catalog,
+                         response_cache=args.response_cache)
+        drive_load(port, args.mix, min(args.concurrency, 4), args.warmup, args.seed)
+
+        pids = _process_tree(proc.pid)
+        cpu_start = _tree_cpu_seconds(pids)
+        fetches_start = feed_server.fetches
+        wall_start = time.perf_counter()
+        stats = drive_load(port, args.mix, args.concurrency, args.duration, args.seed)
+        wall = time.perf_counter() - wall_start
+        fetches = feed_server.fetches - fetches_start
+        cpu_end = _tree_cpu_seconds(pids)
+        pss = [value for value in (_pss_mb(pid) for pid in pids) if value is not None]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    cores_used = (cpu_end - cpu_start) / wall if cpu_start is not None and cpu_end is not None else None
+    return {
+        'workers': workers,
+        'waitress_threads': waitress_threads,
+        'ort_intra_op_threads': ort_threads,
+        'concurrency': args.concurrency,
+        'throughput_rps': stats['overall']['requests'] / wall,
+        'cpu_cores_used': cores_used,
+        # Share of all cores on this machine the server kept busy
+        'cpu_saturation': cores_used / os.cpu_count() if cores_used is not None else None,
+        'upstream_fetches_per_min': fetches / wall * 60,
+        'max_process_pss_mb': max(pss) if pss else None,
+        'total_pss_mb': sum(pss) if pss else None,
+        **stats,
+    }
+
+
+def print_report(rows: List[dict]):
+    header = (f"{'workers':>7} {'threads':>7} {'ort':>4} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>7} {'cpu':>6} {'fetch/min':>9} {'pss MB':>7}")
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        overall = row['overall']
+        cpu = f"{row['cpu_saturation']:.0%}" if row['cpu_saturation'] is not None else 'n/a'
+        pss = f"{row['max_process_pss_mb']:.0f}" if row['max_process_pss_mb'] is not None else 'n/a'
+        print(f"{row['workers']:>7} {row['waitress_threads']:>7} {row['ort_intra_op_threads']:>4} "
+              f"{row['throughput_rps']:>8.1f} {overall['p50_ms']:>8.1f} {overall['p95_ms']:>8.1f} "
+              f"{overall['p99_ms']:>8.1f} {overall['error_rate']:>7.2%} {cpu:>6} "
+              f"{row['upstream_fetches_per_min']:>9.1f} {pss:>7}")
+
+    best = max(rows, key=lambda row: (row['overall']['error_rate'] == 0, row['throughput_rps']))
+    print(f"\nHighest error-free throughput: workers={best['workers']} threads={best['waitress_threads']} "
+          f"ort={best['ort_intra_op_threads']} ({best['throughput_rps']:.1f} rps, "
+          f"p99 {best['overall']['p99_ms']:.1f}ms)")
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(','):
+        path, _, weight = part.partition(':')
+        mix[path.strip()] = float(weight or 1)
+    return mix
+
+
+def _parse_ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test app.py across process and thread configurations")
+    parser.add_argument('--workers', type=_parse_ints, default=[1],
+                        help="Comma separated serving process counts to sweep (more than 1 runs prefork.py)")
+    parser.add_argument('--threads', type=_parse_ints, default=[1, 2, 4, 8],
+                        help="Comma separated waitress thread counts to sweep")
+    parser.add_argument('--ort-threads', type=_parse_ints, default=[1],
+                        help="Comma separated onnxruntime intra-op thread counts to sweep")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds of measured load per configuration")
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--mix', type=_parse_mix, default=_parse_mix('/:1,/predict:8,/health:1'),
+                        help="Weighted request mix, e.g. '/:1,/predict:8,/health:1'")
+    parser.add_argument('--episodes', type=int, default=500, help="Items in the stand-in feed")
+    parser.add_argument('--feed-refresh-seconds', type=float, default=300.0)
+    parser.add_argument('--bust-cache', action='store_true',
+                        help="Serve a new feed version on every fetch")
+    parser.add_argument('--response-cache', action='store_true',
+                        help="Keep the app's /predict response cache on, so warm requests skip inference")
+    parser.add_argument('--score-catalog', action='store_true',
+                        help="Keep background catalog rescoring on (each new feed version rescores every episode)")
+    parser.add_argument('--seed', type=int, default=33)
+    parser.add_argument('--output', default='logs/load_test_report.json')
+    args = parser.parse_args()
+
+    feed_server = start_feed_server(args.episodes, args.seed, args.bust_cache)
+    feed_url = f"http://127.0.0.1:{feed_server.server_address[1]}/feed.xml"
+
+    rows = []
+    for workers, waitress_threads, ort_threads in itertools.product(args.workers, args.threads, args.ort_threads):
+        print(f"Running workers={workers} threads={waitress_threads} ort={ort_threads} for {args.duration}s...")
+        rows.append(run_configuration(feed_server, feed_url, workers, waitress_threads, ort_threads, args))
+    feed_server.shutdown()
+
+    print()
+    print_report(rows)
+
+    os.makedirs(os.path.dirname(os.path.join(APP_DIR, args.output)), exist_ok=True)
+    with open(os.path.join(APP_DIR, args.output), 'w') as f:
+        json.dump({'config': {k: v for k, v in vars(args).items() if k != 'output'}, 'results': rows}, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
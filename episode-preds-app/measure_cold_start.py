@@ -0,0 +1,116 @@
+"""
+Measure time-to-first-prediction for the prediction service.
+
+Serves a synthetic RSS feed locally (load_test.start_feed_server), starts
+app.py in a fresh process for each mode and records, from process spawn:
+
+- first /health: the port is open. Cold start mode reaches this before the
+  model loads, so on its own it only shows deferred work.
+- first /predict: a real prediction, which needs the model, the feed and
+  inference. This is the number cold start mode has to improve.
+
+    python measure_cold_start.py --runs 5
+
+Cold start mode runs the way the Docker image does: with COLD_START_MODE=1
+and a graph-optimized model copy prepared ahead of time (optimize_model.py).
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from load_test import _free_port, start_feed_server
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _wait_for(port: int, path: str, start: float, timeout: float) -> float:
+    """Poll `path` until it answers HTTP 200 and return seconds since `start`."""
+    while time.perf_counter() - start < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=timeout) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"{path} answered HTTP {e.code} during startup")
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            time.sleep(0.01)
+    raise TimeoutError(f"No response from {path} within {timeout}s")
+
+
+def time_to_first_responses(env_overrides: dict, feed_url: str, timeout: float) -> dict:
+    """
+    Launch the app and time its first /health and first /predict.
+
+    Args:
+        env_overrides: Extra environment variables for the app process
+        feed_url: RSS feed the app should fetch
+        timeout: Give up after this many seconds
+
+    Returns:
+        dict: Seconds from process spawn to the first successful 'health'
+        and 'predict' responses
+    """
+    port = _free_port()
+    store_dir = tempfile.mkdtemp(prefix='cold_start_store_')
+    env = {**os.environ, 'PORT': str(port), 'HOST': '127.0.0.1', 'FLASK_ENV': 'production',
+           'RSS_FEED_URL': feed_url, 'PREDICTION_STORE_DIR': store_dir, **env_overrides}
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'app.py'], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        health = _wait_for(port, '/health', start, timeout)
+        predict = _wait_for(port, '/predict', start, timeout)
+        return {'health': health, 'predict': predict}
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time to first /health and /predict per startup mode")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--episodes', type=int, default=500, help="Items in the stand-in feed")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--model', default='episode_banger_model.onnx')
+    args = parser.parse_args()
+
+    from optimize_model import optimize_model
+
+    feed_server = start_feed_server(args.episodes, seed=33, bust_cache=False)
+    feed_url = f"http://127.0.0.1:{feed_server.server_address[1]}/feed.xml"
+    with tempfile.TemporaryDirectory(prefix='optimized_models_') as optimized_dir:
+        # What the image build does, so cold start mode skips the optimization pass
+        optimize_model(os.path.join(APP_DIR, args.model), optimized_dir)
+        modes = {
+            'eager': {'COLD_START_MODE': '0', 'MODEL_PATH': args.model, 'MODEL_OPTIMIZED_DIR': ''},
+            'cold_start': {'COLD_START_MODE': '1', 'MODEL_PATH': args.model, 'MODEL_OPTIMIZED_DIR': optimized_dir},
+        }
+
+        medians = {}
+        for mode, env_overrides in modes.items():
+            samples = [time_to_first_responses(env_overrides, feed_url, args.timeout) for _ in range(args.runs)]
+            medians[mode] = {}
+            for phase in ('health', 'predict'):
+                values = [sample[phase] for sample in samples]
+                medians[mode][phase] = statistics.median(values)
+                print(f"{mode:>10} first /{phase:<7}: median {medians[mode][phase] * 1000:.0f}ms "
+                      f"(min {min(values) * 1000:.0f}ms, max {max(values) * 1000:.0f}ms, n={args.runs})")
+    feed_server.shutdown()
+
+    saved = medians['eager']['predict'] - medians['cold_start']['predict']
+    print(f"Cold start mode changes time to first /predict by {-saved * 1000:+.0f}ms "
+          f"({-saved / medians['eager']['predict']:+.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, List, NamedTuple, Optional
+
+logger = logging.getLogger('duncd_on_app')
+
+
+def optimized_model_path(directory: str, sha256: str) -> str:
+    """Where the graph-optimized copy of the model with this hash lives."""
+    return os.path.join(directory, f"{sha256}.onnx")
+
+
+def build_optimized_session(model_bytes: bytes, output_path: str, sess_options=None):
+    """
+    Build a session with onnxruntime's extended optimizations and save the
+    optimized graph to `output_path` for later loads.
+
+    Returns:
+        onnxruntime.InferenceSession: The session built while optimizing
+    """
+    import onnxruntime
+
+    if sess_options is None:
+        sess_options = onnxruntime.SessionOptions()
+    # Extended (not ALL) keeps the saved graph portable across CPU types
+    sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    # Written under a temporary name so a concurrent load never sees half a file
+    tmp_path = f"{output_path[:-len('.onnx')]}.{os.getpid()}.tmp.onnx"
+    sess_options.optimized_model_filepath = tmp_path
+    session = onnxruntime.InferenceSession(model_bytes, sess_options, providers=['CPUExecutionProvider'])
+    os.replace(tmp_path, output_path)
+    return session
+
+
+class ActiveModel(NamedTuple):
+    """Immutable snapshot of the model currently serving requests."""
+    session: Any  # onnxruntime.InferenceSession, imported lazily to keep app startup fast
+    sha256: str
+    path: str
+    loaded_at: float
+
+
+class ModelRegistry:
+    """
+    Owns the ONNX session and swaps in retrained models without a restart.
+
+    New sessions are built and warmed on the caller's thread (the watcher or
+    the admin reload request), never on the prediction path. The swap itself
+    is a single reference assignment, so a request that grabbed current()
+    keeps using its snapshot until it finishes while new requests see the new
+    model.
+    """
+
+    def __init__(self, model_path: str, optimized_dir: Optional[str] = None):
+        """
+        Args:
+            model_path: Path to the .onnx file to serve, as exported by
+                train_banger_model.py
+            optimized_dir: Directory of graph-optimized copies keyed by model
+                hash (see optimize_model.py). A model with a copy there
+                loads with onnxruntime's optimization pass disabled; one
+                without is optimized during reload, which is never on the
+                request path, and the copy saved for the next load. None
+                optimizes in memory on every load.
+        """
+        self.model_path = model_path
+        self.optimized_dir = optimized_dir
+        self._active: Optional[ActiveModel] = None
+        self._reload_lock = threading.Lock()
+        self._listeners: List[Callable[[ActiveModel], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def current(self) -> ActiveModel:
+        """Return the active model snapshot, loading it on first use."""
+        active = self._active
+        if active is None:
+            self.reload()
+            active = self._active
+        return active
+
+    @property
+    def active_sha256(self) -> Optional[str]:
+        """Hash of the active model, or None while the first load is pending."""
+        active = self._active
+        return active.sha256 if active is not None else None
+
+    def add_swap_listener(self, listener: Callable[[ActiveModel], None]):
+        """Register a callback run after each swap, e.g. to drop model-dependent caches."""
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        """
+        Load the model file if its contents changed and swap it in.
+
+        Returns:
+            bool: True if a new model was swapped in, False if unchanged
+
+        Raises:
+            Exception: If the new model fails to load or warm up. The
+                previously active model stays in place.
+        """
+        with self._reload_lock:
+            with open(self.model_path, 'rb') as f:
+                model_bytes = f.read()
+            sha256 = hashlib.sha256(model_bytes).hexdigest()
+
+            if self._active is not None and self._active.sha256 == sha256:
+                return False
+
+            start = time.perf_counter()
+            session = self._build_session(model_bytes, sha256)
+            self._warm_up(session)
+
+            previous = self._active
+            self._active = ActiveModel(session, sha256, self.model_path, time.time())
+            logger.info("Model %s active (replaced %s, load+warm %.3fs)",
+                        sha256[:12], previous.sha256[:12] if previous else 'none', time.perf_counter() - start)
+
+        for listener in self._listeners:
+            try:
+                listener(self._active)
+            except Exception as e:
+                logger.error("Model swap listener failed: %s", e, exc_info=True)
+        return True
+
+    @staticmethod
+    def _session_options():
+        import onnxruntime
+
+        sess_options = onnxruntime.SessionOptions()
+        # 0 lets onnxruntime pick (one thread per core); see load_test.py for sizing
+        sess_options.intra_op_num_threads = int(os.environ.get('ORT_INTRA_OP_THREADS', 0))
+        sess_options.inter_op_num_threads = int(os.environ.get('ORT_INTER_OP_THREADS', 0))
+        return sess_options
+
+    def _build_session(self, model_bytes: bytes, sha256: str):
+        import onnxruntime
+
+        if not self.optimized_dir:
+            return onnxruntime.InferenceSession(model_bytes, self._session_options(),
+                                                providers=['CPUExecutionProvider'])
+
+        # Keyed by the source model's hash, so a cached copy can never be
+        # served for a different model than the one at model_path
+        optimized_path = optimized_model_path(self.optimized_dir, sha256)
+        if os.path.exists(optimized_path):
+            sess_options = self._session_options()
+            sess_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                return onnxruntime.InferenceSession(optimized_path, sess_options, providers=['CPUExecutionProvider'])
+            except Exception as e:
+                logger.warning("Optimized copy %s failed to load, rebuilding it: %s", optimized_path, e)
+
+        start = time.perf_counter()
+        session = build_optimized_session(model_bytes, optimized_path, self._session_options())
+        logger.info("Optimized model %s in %.3fs, saved to %s", sha256[:12], time.perf_counter() - start, optimized_path)
+        return session
+
+    @staticmethod
+    def _warm_up(session):
+        """Run one dummy inference so the first real request doesn't pay for lazy init."""
+        import numpy as np
+
+        model_input = session.get_inputs()[0]
+        n_features = model_input.shape[1] if isinstance(model_input.shape[1], int) else 1
+        session.run(None, {model_input.name: np.zeros((1, n_features), dtype=np.float32)})
+
+    def start_watching(self, interval: float):
+        """Poll the model file in a daemon thread and reload when it changes."""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            # None makes the first tick reload too: the file may have changed
+            # after the active model was read, and reload() compares hashes,
+            # so an unchanged file costs one read
+            last_stat = None
+            while not self._stop.wait(interval):
+                try:
+                    stat = os.stat(self.model_path)
+                    signature = (stat.st_mtime_ns, stat.st_size)
+                    if signature != last_stat:
+                        self.reload()
+                    last_stat = signature
+                except Exception as e:
+                    # Keep serving the current model, e.g. while a copy is half written
+                    logger.error("Model watch reload failed: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+        logger.info("Watching %s for changes every %ss", self.model_path, interval)
+
+    def stop_watching(self):
+        self._stop.set()
@@ -0,0 +1,42 @@
+"""
+Graph-optimize the ONNX model ahead of time.
+
+Run at image build time so containers skip onnxruntime's optimization pass on
+every cold start. The copy is keyed by the model's sha256, which is how
+ModelRegistry finds it when MODEL_OPTIMIZED_DIR points at the same directory:
+
+    python optimize_model.py episode_banger_model.onnx .optimized_models
+
+MODEL_PATH keeps pointing at the model itself, so hot reloads pick up a
+newly deployed model; the registry optimizes one without a cached copy
+during the reload.
+"""
+import hashlib
+import sys
+
+from model_registry import build_optimized_session, optimized_model_path
+
+
+def optimize_model(input_path: str, output_dir: str) -> str:
+    """
+    Write an offline-optimized copy of an ONNX model.
+
+    Args:
+        input_path: Path to the model exported by train_banger_model.py
+        output_dir: Directory of optimized copies (MODEL_OPTIMIZED_DIR)
+
+    Returns:
+        str: Path of the optimized copy
+    """
+    with open(input_path, 'rb') as f:
+        model_bytes = f.read()
+    output_path = optimized_model_path(output_dir, hashlib.sha256(model_bytes).hexdigest())
+    build_optimized_session(model_bytes, output_path)
+    print(f"Optimized model saved to {output_path}")
+    return output_path
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        raise SystemExit("Usage: python optimize_model.py <input.onnx> <output_dir>")
+    optimize_model(sys.argv[1], sys.argv[2])
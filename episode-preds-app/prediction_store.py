@@ -0,0 +1,415 @@
+"""
+Predictions for every episode in the feed, scored at ingest time.
+
+On disk the store is Parquet partitioned by publication month:
+
+    <directory>/CURRENT                          name of the live version
+    <directory>/<version>/_meta.json             model hash, feed version, row count
+    <directory>/<version>/month=YYYY-MM/part-0.parquet
+    <directory>/<version>/index/*.npy            the query index below
+
+Each write goes to a fresh version directory and then flips CURRENT, so
+readers (including other worker processes) never see a half-written store.
+
+Queries never touch Parquet: they run on numpy arrays sorted by date, plus
+a probability-descending order of the rows precomputed per episode type.
+The writer saves these arrays next to the Parquet and readers memory-map
+them, so serving worker processes share one copy in the page cache and
+load a new version without polars. A date range is two binary searches;
+sort=probability walks the precomputed order until the page is full, or
+for narrow ranges sorts just the rows in range, whichever is cheaper. No
+request sorts the whole catalog.
+
+numpy and polars are imported on first use, so importing this module
+doesn't put them on the app's startup path.
+"""
+from __future__ import annotations
+
+import math
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Same vocabulary as the labeling app's episode_type choices
+EPISODE_TYPES = ['daily_duncs', 'hollinger_duncan', 'gamer', 'big_picture']
+SORTS = ('date', 'probability')
+MAX_PAGE_SIZE = 100
+
+
+class _Index(NamedTuple):
+    version: str
+    model_sha256: str
+    feed_version: str
+    timestamps: np.ndarray  # int64 epoch seconds, ascending
+    probabilities: np.ndarray  # float32
+    type_codes: np.ndarray  # int8 index into EPISODE_TYPES
+    # Fixed-width unicode arrays, so they can be memory-mapped too
+    guids: np.ndarray
+    titles: np.ndarray
+    dates: np.ndarray  # ISO 8601, as returned by /predict
+    # Keyed by type code, None for all types: row indices of that type in
+    # date order, their timestamps, and the same rows by probability
+    # (highest first, ties newest first then by row)
+    rows_by_type: Dict[Optional[int], np.ndarray]
+    timestamps_by_type: Dict[Optional[int], np.ndarray]
+    probability_order_by_type: Dict[Optional[int], np.ndarray]
+
+
+def classify_episode_type(title):
+    """
+    Polars expression mapping an episode title to an EPISODE_TYPES code.
+
+    Mirrors how the labeled types line up with the title keywords used as
+    model features.
+    """
+    import polars as pl
+
+    return (
+        pl.when(title.str.contains(r"Daily Duncs")).then(0)
+        .when(title.str.contains(r"H&D")).then(1)
+        .when(title.str.contains(r"Game [1-7]")).then(2)
+        .otherwise(3)
+        .cast(pl.Int8)
+    )
+
+
+def parse_query_time(value: Optional[str]) -> Optional[int]:
+    """Parse an ISO date/datetime query parameter to epoch seconds (naive means UTC)."""
+    if value is None or value == '':
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}', expected ISO 8601 like 2024-05-01 or 2024-05-01T12:00:00+00:00")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _query_hash(start: Optional[int], end: Optional[int], episode_type: Optional[str], sort: str) -> str:
+    """Short hash of the parameters that select and order a result set."""
+    key = json.dumps([start, end, episode_type, sort], separators=(',', ':')).encode()
+    return hashlib.sha256(key).hexdigest()[:12]
+
+
+def _encode_cursor(version: str, offset: int, query_hash: str) -> str:
+    payload = json.dumps({'v': version, 'o': offset, 'q': query_hash}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        version, offset, query_hash = payload['v'], int(payload['o']), payload['q']
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if offset < 0:
+        raise ValueError("Invalid cursor")
+    return version, offset, query_hash
+
+
+class StaleCursorError(ValueError):
+    """The catalog was rescored since the cursor was issued."""
+
+
+class PredictionStore:
+    """Date-partitioned catalog predictions with an in-memory query index."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._index: Optional[_Index] = None
+        self._write_lock = threading.Lock()
+
+    @property
+    def model_sha256(self) -> Optional[str]:
+        index = self._index
+        return index.model_sha256 if index is not None else None
+
+    @property
+    def feed_version(self) -> Optional[str]:
+        index = self._index
+        return index.feed_version if index is not None else None
+
+    @property
+    def version(self) -> Optional[str]:
+        index = self._index
+        return index.version if index is not None else None
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> bool:
+        """
+        Load the live version from disk if it differs from the one in memory.
+
+        Returns:
+            bool: True if a store was (re)loaded
+        """
+        version = self._current_version()
+        if version is None or version == self.version:
+            return False
+
+        version_dir = os.path.join(self.directory, version)
+        with open(os.path.join(version_dir, '_meta.json')) as f:
+            meta = json.load(f)
+        if os.path.isdir(os.path.join(version_dir, 'index')):
+            self._index = self._map_index(os.path.join(version_dir, 'index'), version, meta)
+            return True
+
+        # Written before the index was saved alongside; build it from
+        # Parquet. Only here, so mapping the index never pulls in polars.
+        import polars as pl
+
+        if meta['rows']:
+            df = pl.read_parquet(os.path.join(version_dir, 'month=*', '*.parquet'))
+        else:
+            df = pl.DataFrame(schema={'guid': pl.Utf8, 'episode': pl.Utf8, 'date': pl.Utf8,
+                                      'timestamp': pl.Int64, 'probability': pl.Float32, 'type_code': pl.Int8})
+        self._index = self._build_index(df.sort('timestamp'), version, meta)
+        return True
+
+    @staticmethod
+    def _build_index(df, version: str, meta: dict) -> _Index:
+        import numpy as np
+
+        timestamps = df['timestamp'].to_numpy().astype(np.int64)
+        probabilities = df['probability'].to_numpy().astype(np.float32)
+        type_codes = df['type_code'].to_numpy().astype(np.int8)
+
+        all_rows = np.arange(len(timestamps))
+        probability_order = np.lexsort((-all_rows, -timestamps, -probabilities))
+        rows_by_type = {None: all_rows}
+        probability_order_by_type = {None: probability_order}
+        for code in range(len(EPISODE_TYPES)):
+            rows_by_type[code] = np.flatnonzero(type_codes == code)
+            # Filtering keeps the global order, ties included
+            probability_order_by_type[code] = probability_order[type_codes[probability_order] == code]
+
+        return _Index(
+            version=version,
+            model_sha256=meta['model_sha256'],
+            feed_version=meta['feed_version'],
+            timestamps=timestamps,
+            probabilities=probabilities,
+            type_codes=type_codes,
+            guids=np.array(df['guid'].to_list(), dtype=str),
+            titles=np.array(df['episode'].to_list(), dtype=str),
+            dates=np.array(df['date'].to_list(), dtype=str),
+            rows_by_type=rows_by_type,
+            timestamps_by_type={code: timestamps[rows] for code, rows in rows_by_type.items()},
+            probability_order_by_type=probability_order_by_type,
+        )
+
+    @staticmethod
+    def _index_files(index: _Index) -> Dict[str, np.ndarray]:
+        files = {name: getattr(index, name)
+                 for name in ('timestamps', 'probabilities', 'type_codes', 'guids', 'titles', 'dates')}
+        for code in index.rows_by_type:
+            key = 'all' if code is None else str(code)
+            files[f'rows_{key}'] = index.rows_by_type[code]
+            files[f'timestamps_{key}'] = index.timestamps_by_type[code]
+            files[f'probability_order_{key}'] = index.probability_order_by_type[code]
+        return files
+
+    @staticmethod
+    def _save_index(directory: str, index: _Index):
+        import numpy as np
+
+        os.makedirs(directory, exist_ok=True)
+        for name, array in PredictionStore._index_files(index).items():
+            np.save(os.path.join(directory, f'{name}.npy'), array)
+
+    @staticmethod
+    def _map_index(directory: str, version: str, meta: dict) -> _Index:
+        import numpy as np
+
+        def load(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+
+        codes = [None] + list(range(len(EPISODE_TYPES)))
+        keys = {code: 'all' if code is None else str(code) for code in codes}
+        return _Index(
+            version=version,
+            model_sha256=meta['model_sha256'],
+            feed_version=meta['feed_version'],
+            timestamps=load('timestamps'),
+            probabilities=load('probabilities'),
+            type_codes=load('type_codes'),
+            guids=load('guids'),
+            titles=load('titles'),
+            dates=load('dates'),
+            rows_by_type={code: load(f'rows_{keys[code]}') for code in codes},
+            timestamps_by_type={code: load(f'timestamps_{keys[code]}') for code in codes},
+            probability_order_by_type={code: load(f'probability_order_{keys[code]}') for code in codes},
+        )
+
+    def write(self, df, model_sha256: str, feed_version: str):
+        """
+        Persist a freshly scored catalog and make it live.
+
+        Args:
+            df: polars DataFrame with guid, episode, date (ISO string),
+                timestamp (epoch seconds), probability and type_code columns
+            model_sha256: Hash of the model that produced the probabilities
+            feed_version: FeedSnapshot.version the episodes came from
+        """
+        import polars as pl
+
+        with self._write_lock:
+            version = f"v{time.time_ns()}"
+            version_dir = os.path.join(self.directory, version)
+            df = df.sort('timestamp').with_columns(
+                pl.from_epoch(pl.col('timestamp'), time_unit='s').dt.strftime('%Y-%m').alias('month')
+            )
+            for month in df['month'].unique().to_list():
+                partition_dir = os.path.join(version_dir, f"month={month}")
+                os.makedirs(partition_dir, exist_ok=True)
+                df.filter(pl.col('month') == month).drop('month').write_parquet(
+                    os.path.join(partition_dir, 'part-0.parquet')
+                )
+
+            meta = {'model_sha256': model_sha256, 'feed_version': feed_version,
+                    'rows': df.height, 'written_at': time.time()}
+            index = self._build_index(df.drop('month'), version, meta)
+            self._save_index(os.path.join(version_dir, 'index'), index)
+            with open(os.path.join(version_dir, '_meta.json'), 'w') as f:
+                json.dump(meta, f)
+
+            tmp_path = os.path.join(self.directory, '.CURRENT.tmp')
+            with open(tmp_path, 'w') as f:
+                f.write(version)
+            os.replace(tmp_path, os.path.join(self.directory, 'CURRENT'))
+
+            self._index = index
+            self._remove_old_versions(keep=version)
+
+    def _remove_old_versions(self, keep: str):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name != keep and name.startswith('v') and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def query(self, start: Optional[int] = None, end: Optional[int] = None,
+              episode_type: Optional[str] = None, sort: str = 'date', limit: int = 20,
+              cursor: Optional[str] = None) -> dict:
+        """
+        Page through stored predictions.
+
+        Args:
+            start: Inclusive lower bound on publish time (epoch seconds)
+            end: Exclusive upper bound on publish time (epoch seconds)
+            episode_type: One of EPISODE_TYPES
+            sort: 'date' (newest first) or 'probability' (highest first, so
+                the first page of size k is the top-k)
+            limit: Page size, at most MAX_PAGE_SIZE
+            cursor: next_cursor from the previous page, requested with the
+                same start, end, episode_type and sort
+
+        Returns:
+            dict: 'episodes' for this page and 'next_cursor' (None on the last page)
+
+        Raises:
+            ValueError: For invalid parameters, or a cursor issued for
+                different start/end/episode_type/sort
+            StaleCursorError: If the store was rescored after the cursor was issued
+        """
+        import numpy as np
+
+        index = self._index
+        if index is None:
+            raise RuntimeError("Prediction store has not been built yet")
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        if episode_type is not None and episode_type not in EPISODE_TYPES:
+            raise ValueError(f"type must be one of {', '.join(EPISODE_TYPES)}")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+        query_hash = _query_hash(start, end, episode_type, sort)
+        offset = 0
+        if cursor:
+            cursor_version, offset, cursor_query_hash = _decode_cursor(cursor)
+            if cursor_query_hash != query_hash:
+                # The offset only means something within the result set it came from
+                raise ValueError("Cursor was issued for different start, end, type or sort parameters")
+            if cursor_version != index.version:
+                raise StaleCursorError("Cursor is stale because predictions were refreshed, restart from the first page")
+
+        code = None if episode_type is None else EPISODE_TYPES.index(episode_type)
+        rows = index.rows_by_type[code]
+        timestamps = index.timestamps_by_type[code]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        hi = len(rows) if end is None else max(lo, int(np.searchsorted(timestamps, end, side='left')))
+        matching = hi - lo
+
+        page_end = offset + limit
+        if sort == 'date':
+            # Rows are ascending by date, so newest first is a reversed slice
+            page = rows[max(lo, hi - page_end):max(lo, hi - offset)][::-1]
+        else:
+            page = self._top_by_probability(index, code, lo, hi, page_end)[offset:page_end]
+
+        episodes = [
+            {
+                'guid': str(index.guids[row]),
+                'episode': str(index.titles[row]),
+                'date': str(index.dates[row]),
+                'probability': float(round(float(index.probabilities[row]), 2)),
+                'episode_type': EPISODE_TYPES[index.type_codes[row]],
+            }
+            for row in page
+        ]
+        next_cursor = _encode_cursor(index.version, page_end, query_hash) if page_end < matching else None
+        return {'episodes': episodes, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def _top_by_probability(index: _Index, code: Optional[int], lo: int, hi: int, count: int) -> np.ndarray:
+        """
+        The first `count` rows of rows_by_type[code][lo:hi] in probability order.
+
+        Walking the precomputed order touches about count * total / in_range
+        rows; sorting the range costs in_range * log(in_range). Either way
+        ties break identically (newest first, then by row), so pages stay
+        stable across requests.
+        """
+        import numpy as np
+
+        rows = index.rows_by_type[code]
+        in_range = hi - lo
+        if in_range == 0 or count == 0:
+            return rows[:0]
+
+        walk_cost = count * len(rows) / in_range
+        if in_range * math.log2(in_range + 1) <= walk_cost:
+            candidates = rows[lo:hi]
+            order = np.lexsort((-candidates, -index.timestamps[candidates], -index.probabilities[candidates]))
+            return candidates[order[:count]]
+
+        # Rows in the date range are exactly those between its first and
+        # last row, since row order is date order
+        first_row, last_row = rows[lo], rows[hi - 1]
+        probability_order = index.probability_order_by_type[code]
+        found, found_count, position = [], 0, 0
+        chunk = max(256, int(2 * walk_cost))
+        while found_count < count and position < len(probability_order):
+            block = probability_order[position:position + chunk]
+            hits = block[(block >= first_row) & (block <= last_row)]
+            found.append(hits)
+            found_count += len(hits)
+            position += chunk
+            chunk *= 2
+        return np.concatenate(found)[:count]
@@ -0,0 +1,172 @@
+"""
+Multi-process serving: a prefork supervisor for app.py.
+
+    WEB_WORKERS=4 python prefork.py
+
+The supervisor binds the listening socket, then forks:
+
+- one refresher process (SERVING_ROLE=refresher) that fetches the feed
+  upstream, publishes it to the shared feed file and scores the catalog
+  into the prediction store;
+- WEB_WORKERS serving processes (SERVING_ROLE=worker) that each run waitress
+  on the inherited socket, read the feed from the shared file and load the
+  catalog the refresher wrote.
+
+Upstream fetches and catalog scoring therefore happen once no matter how
+many workers run. The supervisor itself never imports app.py, so nothing
+with threads (the log listener, onnxruntime) exists before a fork. Children
+that die are restarted into the same slot (refresher, worker-0, ...), which
+also names their log file; SIGTERM/SIGINT are passed on to every child,
+which drains its log queue before exiting.
+
+WEB_WORKERS unset or 1 runs the plain single-process server. POSIX only.
+"""
+import logging
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+
+from structured_logging import stop_logging
+
+logger = logging.getLogger('duncd_on_app.prefork')
+
+# Restarting a child that keeps crashing on import would spin, so wait this
+# long before replacing one that lived less than MIN_CHILD_LIFETIME seconds
+RESTART_BACKOFF_SECONDS = 5.0
+MIN_CHILD_LIFETIME = 10.0
+
+
+def _shared_cache_dir():
+    """
+    Returns:
+        Tuple of the directory and whether it was created for this run (and
+        so should be removed on shutdown)
+    """
+    directory = os.environ.get('SHARED_CACHE_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        return directory, False
+    # tmpfs where available, so the shared feed file never touches disk
+    parent = '/dev/shm' if os.path.isdir('/dev/shm') else None
+    return tempfile.mkdtemp(prefix='duncd-on-', dir=parent), True
+
+
+def _exit_on_signal(signum, frame):
+    # Unwind to _run_child's finally (waitress closes its server on the way)
+    # instead of dying with log records still queued
+    raise SystemExit(0)
+
+
+def _run_child(role: str, slot: str, sock: socket.socket):
+    """Body of a forked child; never returns."""
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        signal.signal(signal.SIGINT, _exit_on_signal)
+        os.environ['SERVING_ROLE'] = role
+        # Names the child's log file, so a restarted child appends to the
+        # file of the one it replaced
+        os.environ['SERVING_SLOT'] = slot
+        import app
+
+        if role == 'refresher':
+            sock.close()
+            app.run_refresher()
+        else:
+            from waitress import serve
+            serve(app.app, sockets=[sock], threads=int(os.environ.get('WAITRESS_THREADS', 4)))
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        logging.getLogger('duncd_on_app').exception("%s process failed", role)
+        code = 1
+    finally:
+        # os._exit() skips atexit, so drain the log queue here
+        stop_logging()
+        logging.shutdown()
+        os._exit(code)
+
+
+def serve_prefork(workers: int, host: str, port: int):
+    """
+    Bind host:port, fork the refresher and `workers` serving processes, and
+    supervise them until SIGTERM/SIGINT.
+    """
+    os.environ['SHARED_CACHE_DIR'], remove_cache_dir = _shared_cache_dir()
+    # N processes each sizing onnxruntime to every core would oversubscribe
+    # the CPU; one intra-op thread per worker unless configured otherwise
+    os.environ.setdefault('ORT_INTRA_OP_THREADS', '1')
+
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+
+    children = {}  # pid -> (role, slot, started_at)
+
+    def spawn(role: str, slot: str):
+        pid = os.fork()
+        if pid == 0:
+            _run_child(role, slot, sock)
+        children[pid] = (role, slot, time.monotonic())
+        logger.info("Started %s process %d", slot, pid)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    spawn('refresher', 'refresher')
+    for index in range(workers):
+        spawn('worker', f'worker-{index}')
+    logger.info("Serving on %s:%d with %d workers, shared cache in %s",
+                host, port, workers, os.environ['SHARED_CACHE_DIR'])
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        role, slot, started_at = children.pop(pid, (None, None, None))
+        if role is None or stopping:
+            continue
+        logger.error("%s process %d exited with status %d, restarting",
+                     slot, pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started_at < MIN_CHILD_LIFETIME:
+            time.sleep(RESTART_BACKOFF_SECONDS)
+        if not stopping:
+            spawn(role, slot)
+
+    sock.close()
+    if remove_cache_dir:
+        shutil.rmtree(os.environ['SHARED_CACHE_DIR'], ignore_errors=True)
+
+
+def main():
+    workers = int(os.environ.get('WEB_WORKERS', 1))
+    if workers <= 1 or os.environ.get('FLASK_ENV') == 'development':
+        import app
+        app.main()
+        return
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if not os.environ.get('RSS_FEED_URL'):
+        logger.error("Missing required environment variables: RSS_FEED_URL")
+        raise SystemExit("Missing required environment variables")
+    serve_prefork(workers, os.environ.get('HOST', '0.0.0.0'), int(os.environ.get('PORT', 8080)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+The raw RSS feed shared between serving worker processes through one
+memory-mapped file.
+
+In multi-process serving (prefork.py) a single refresher process fetches
+upstream and publishes each fetch here. Serving workers map the file
+instead of fetching, so upstream traffic doesn't grow with the worker
+count and every worker pays for the feed bytes once, in the page cache.
+
+File layout:
+
+    magic (8 bytes) | feed version (16 ascii) | fetched_at (float64) | length (uint64) | feed bytes
+
+Every publish writes a new file and renames it over the old one, so a
+worker either maps the previous feed or the new one, never a partial
+write. A mapping stays valid after the rename; it's dropped on the next
+read that notices the new file.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional, Union
+
+from feed_cache import FeedSnapshot, feed_version
+
+_MAGIC = b'DUNCFEED'
+_HEADER = struct.Struct('<8s16sdQ')
+
+
+class PublishedFeed(NamedTuple):
+    version: str
+    fetched_at: float
+    content: memoryview  # into the shared mapping, valid until the next publish is mapped
+
+
+class SharedFeedFile:
+    """Publish (refresher) and map (workers) the latest raw feed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = None
+        self._mapping: Optional[mmap.mmap] = None
+        self._published: Optional[PublishedFeed] = None
+        self._lock = threading.Lock()
+
+    def publish(self, content: bytes) -> bytes:
+        """
+        Make `content` the shared feed, stamped with the current time.
+
+        Returns the content unchanged so it can wrap a FeedCache fetch.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, feed_version(content).encode(), time.time(), len(content)))
+            f.write(content)
+        os.replace(tmp_path, self.path)
+        return content
+
+    def read(self) -> Optional[PublishedFeed]:
+        """
+        The latest published feed, or None if nothing has been published yet.
+
+        Costs one stat() when the file hasn't changed since the last call.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return self._published
+
+        with self._lock:
+            if signature != self._signature:
+                with open(self.path, 'rb') as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, fetched_at, length = _HEADER.unpack_from(mapping)
+                if magic != _MAGIC or _HEADER.size + length > len(mapping):
+                    mapping.close()
+                    raise RuntimeError(f"{self.path} is not a shared feed file")
+                # The old mapping isn't closed: a request may still be
+                # parsing from it, and it's unmapped once unreferenced
+                self._mapping = mapping
+                self._published = PublishedFeed(version.decode(), fetched_at,
+                                                memoryview(mapping)[_HEADER.size:_HEADER.size + length])
+                self._signature = signature
+            return self._published
+
+
+class SharedFeedCache:
+    """
+    FeedCache for serving workers: same interface, but snapshots come from
+    the refresher's SharedFeedFile instead of upstream.
+
+    Each worker parses a feed version once, straight from the shared
+    mapping, and only when it has to score /predict itself (see
+    shared_predictions.py). Snapshot freshness (and so the Cache-Control
+    max-age on /predict) follows the refresher's fetch time.
+    """
+
+    def __init__(self, shared_file: SharedFeedFile, parse: Callable[[bytes], List[dict]],
+                 refresh_interval: float,
+                 on_new_version: Optional[Callable[[FeedSnapshot], None]] = None,
+                 wait_timeout: float = 30.0):
+        """
+        Args:
+            shared_file: Where the refresher publishes the feed
+            parse: Turns raw feed bytes into a list of episode dicts;
+                it's given a memoryview into the mapping, not a copy
+            refresh_interval: The refresher's FEED_REFRESH_SECONDS
+            on_new_version: Called with the new snapshot whenever the
+                published feed contents change
+            wait_timeout: Seconds get() waits for the refresher's first
+                publish before giving up
+        """
+        self._shared_file = shared_file
+        self._parse = parse
+        self._on_new_version = on_new_version
+        self.refresh_interval = refresh_interval
+        self.wait_timeout = wait_timeout
+        self._snapshot: Optional[FeedSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> FeedSnapshot:
+        """Return a snapshot of the latest published feed."""
+        published = self._shared_file.read()
+        deadline = time.time() + self.wait_timeout
+        while published is None:
+            # Only right after startup, before the refresher's first fetch lands
+            if time.time() >= deadline:
+                raise RuntimeError("Feed has not been published by the refresher process yet")
+            time.sleep(0.1)
+            published = self._shared_file.read()
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == published.version:
+            if snapshot.fetched_at != published.fetched_at:
+                # Refetched upstream but unchanged, only the clock moves
+                snapshot = self._snapshot = snapshot._replace(fetched_at=published.fetched_at)
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != published.version:
+                snapshot = FeedSnapshot(self._parse(published.content), published.version,
+                                        published.fetched_at)
+                self._snapshot = snapshot
+                if self._on_new_version is not None:
+                    self._on_new_version(snapshot)
+            return snapshot
+
+    def peek(self) -> Optional[FeedSnapshot]:
+        """Return the last snapshot without checking for a newer one."""
+        return self._snapshot
+
+    def expires_in(self, snapshot: Union[FeedSnapshot, PublishedFeed]) -> float:
+        """Seconds until the refresher is due to refetch `snapshot` (a snapshot or the raw published feed)."""
+        return snapshot.fetched_at + self.refresh_interval - time.time()
@@ -0,0 +1,86 @@
+"""
+The finished /predict payload shared between serving worker processes.
+
+Under prefork.py the refresher process scores the recent episodes once per
+feed version, model and (for embedding models) feature store version, and
+publishes the result here. Serving workers answer /predict from it instead
+of each parsing the feed and running the model; they only fall back to
+computing it themselves while their model or feature store is ahead of or
+behind the refresher's.
+
+The file is one small JSON document, replaced atomically by rename:
+
+    {"feed_version": ..., "model_sha256": ..., "feature_store_version": ... | null,
+     "window": [pub time of every episode in the 7-day window, newest first],
+     "episodes": [/predict rows, highest probability first],
+     "timestamps": [pub time of each of those rows]}
+
+Episodes only leave the window between feed versions, and each
+prediction depends on its own episode alone, so dropping the rows that
+have aged out gives exactly what rescoring would.
+"""
+import json
+import os
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class PublishedPredictions(NamedTuple):
+    feed_version: str
+    model_sha256: str
+    feature_store_version: Optional[int]
+    window: List[int]  # epoch seconds, newest first
+    episodes: List[dict]
+    timestamps: List[int]  # epoch seconds, parallel to episodes
+
+    def recent(self, days: int = 7) -> Tuple[int, List[dict]]:
+        """
+        The window size and /predict rows as of now.
+
+        Returns:
+            tuple: (episodes still inside the window, rows for those episodes)
+        """
+        cutoff = time.time() - days * 86400
+        recent_count = sum(1 for published_at in self.window if published_at > cutoff)
+        if recent_count == len(self.window):
+            return recent_count, self.episodes
+        return recent_count, [episode for episode, published_at in zip(self.episodes, self.timestamps)
+                              if published_at > cutoff]
+
+
+class SharedPredictionsFile:
+    """Publish (refresher) and read (workers) the latest /predict payload."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = None
+        self._published: Optional[PublishedPredictions] = None
+        self._lock = threading.Lock()
+
+    def publish(self, predictions: PublishedPredictions):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(predictions._asdict(), f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def read(self) -> Optional[PublishedPredictions]:
+        """
+        The latest published payload, or None if nothing has been published yet.
+
+        Costs one stat() when the file hasn't changed since the last call.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return self._published
+
+        with self._lock:
+            if signature != self._signature:
+                with open(self.path) as f:
+                    self._published = PublishedPredictions(**json.load(f))
+                self._signature = signature
+            return self._published
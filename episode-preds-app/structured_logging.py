@@ -0,0 +1,175 @@
+"""
+Queue-based structured logging that keeps log I/O off waitress worker threads.
+
+Request threads only put LogRecords on an in-memory queue. A single listener
+thread does the JSON formatting, traceback rendering and the file/console
+writes. Each record carries the request id, and the per-request summary
+record carries the stage timings.
+
+Hot-path info logs go through the 'duncd_on_app.request' logger and are
+sampled per request (LOG_SAMPLE_RATE, default 1.0): a request either keeps
+all of its hot-path info records or none, so sampled traces stay complete.
+Warnings, errors and the per-request summary are never sampled out.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+HOT_PATH_LOGGER = 'duncd_on_app.request'
+
+# The running listener, so stop_logging() can drain it
+_listener: Optional[QueueListener] = None
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar('log_sampled', default=True)
+_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar('log_stages', default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with request context when there is one."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key in ('request_id', 'stages_ms', 'http'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+JsonFormatter.converter = time.gmtime
+
+
+class _ContextQueueHandler(QueueHandler):
+    """
+    Stamp request context on the record and enqueue it without formatting.
+
+    The stock QueueHandler.prepare renders the message and traceback on the
+    calling thread. Skipping that leaves the %-interpolation and traceback
+    formatting to the listener thread; log args must therefore not be
+    mutated after the call, which holds for the strings and numbers we log.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = _request_id.get()
+        return record
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Sampling applies to hot-path info logs only
+        if record.name == HOT_PATH_LOGGER and record.levelno <= logging.INFO and not _sampled.get():
+            return False
+        return super().filter(record)
+
+
+def setup_logging(log_dir: str = 'logs', file_name: str = 'app.log') -> logging.Logger:
+    """
+    Route all 'duncd_on_app' logging through a queue to a rotating JSON file
+    and the console.
+
+    Args:
+        log_dir: Directory for the log file
+        file_name: Log file name. Processes must not share one, since each
+            rotates its own file.
+
+    Returns:
+        logging.Logger: The app logger
+    """
+    # Create logs directory if it doesn't exist
+    os.makedirs(log_dir, exist_ok=True)
+
+    file_handler = RotatingFileHandler(
+        os.path.join(log_dir, file_name),
+        maxBytes=1024 * 1024,  # 1MB
+        backupCount=10
+    )
+    file_handler.setFormatter(JsonFormatter())
+    file_handler.setLevel(logging.INFO)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(JsonFormatter())
+
+    global _listener
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    # Drain whatever is still queued on shutdown
+    atexit.register(stop_logging)
+
+    # force: replace anything a parent process (prefork.py) configured before forking
+    logging.basicConfig(level=logging.INFO, handlers=[_ContextQueueHandler(log_queue)], force=True)
+    return logging.getLogger('duncd_on_app')
+
+
+def stop_logging():
+    """
+    Write out every queued record and stop the listener thread.
+
+    Runs at exit; call it directly before os._exit(), which skips atexit
+    handlers (prefork.py's children). Safe to call more than once.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def start_request(request_id: Optional[str] = None, sample_rate: float = 1.0) -> str:
+    """
+    Set up logging context for the current request.
+
+    Args:
+        request_id: Incoming X-Request-ID to propagate, or None to mint one
+        sample_rate: Probability of keeping this request's hot-path info logs
+
+    Returns:
+        str: The request id in effect
+    """
+    # Client supplied ids are echoed into every record, so cap their size
+    request_id = (request_id or uuid.uuid4().hex)[:64]
+    _request_id.set(request_id)
+    _sampled.set(sample_rate >= 1.0 or random.random() < sample_rate)
+    _stages.set({})
+    return request_id
+
+
+def end_request():
+    """Clear request context so it can't leak into the next request on this thread."""
+    _request_id.set(None)
+    _sampled.set(True)
+    _stages.set(None)
+
+
+@contextmanager
+def log_stage(name: str):
+    """Time a block and add it to the current request's stage timings."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _stages.get()
+        if stages is not None:
+            stages[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def request_stages() -> Dict[str, float]:
+    """Stage timings (milliseconds) recorded so far in this request."""
+    return dict(_stages.get() or {})
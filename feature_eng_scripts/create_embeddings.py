@@ -1,8 +1,19 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 from transformers import pipeline
 
+# Write the store with the serving app's own writer so the layout and
+# quantization can't drift from what it reads
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "episode-preds-app"))
+from feature_store import write_store
+
 def main():
-    create_embeddings("data/labeling-app/podcast_episodes.csv")
+    # Pass --quantize to store int8 embeddings for serving
+    df = create_embeddings("data/labeling-app/podcast_episodes.csv")
+    write_feature_store(df, "episode-preds-app/feature_store", quantize="--quantize" in sys.argv)
 
 def create_embeddings(csv_file):
     # Example DataFrame
@@ -34,6 +45,26 @@ def create_embeddings(csv_file):
     
     # Write embeddings
     df.to_parquet("data/labeling-app/description_embeddings.parquet", index=False)
+    return df
+
+def write_feature_store(df, store_dir, quantize=False):
+    """
+    Write embeddings in the guid-keyed layout read by episode-preds-app/feature_store.py.
+
+    Episodes without a description (no embedding) are left out and get the
+    store's fallback vector at serving time. Falls back to titles as keys for
+    CSVs scraped before get_rss_info.py recorded guids.
+    """
+    has_embedding = df['embedding_dimensions'] > 0
+    keys = df['guid'].fillna(df['title']) if 'guid' in df.columns else df['title']
+    guids = keys[has_embedding].astype(str).tolist()
+    embeddings = np.array(df.loc[has_embedding, 'embeddings'].tolist(), dtype=np.float32)
+
+    # Each file is replaced atomically, so a running app that has the store
+    # memory-mapped keeps reading whole files
+    write_store(store_dir, guids, embeddings, quantize=quantize)
+
+    print(f"Wrote {len(guids)} embeddings to {store_dir}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
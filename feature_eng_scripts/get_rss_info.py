@@ -82,6 +82,7 @@ class PodcastRSSParser:
                 
             for item in channel.findall('item'):
                 episode = {
+                    'guid': item.find('guid').text if item.find('guid') is not None else None,
                     'title': item.find('title').text if item.find('title') is not None else 'Unknown Title',
                     'date': self._parse_date(item.find('pubDate').text) if item.find('pubDate') is not None else None,
                     'description': item.find('description').text if item.find('description') is not None else '',
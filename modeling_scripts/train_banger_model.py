@@ -0,0 +1,442 @@
+"""
+Train the episode banger model and export it to ONNX.
+
+This is the scripted version of the modeling cells in
+exploring_banger_dataset.ipynb. Run it from the repo root after a labeling
+session:
+
+    python modeling_scripts/train_banger_model.py
+
+The feature matrix is cached on disk (keyed by the contents of the labeled
+CSVs), the scaler step is memoized through the Pipeline's memory= cache, and
+the elastic net search walks the regularization path with warm starts, so
+retraining on unchanged data only pays for the classifier fits.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Share the keyword engine with the prediction app so training and serving
+# compute identical flags in the identical column order
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "episode-preds-app"))
+from feature_store import EmbeddingFeatureStore
+from keyword_features import DEFAULT_VOCABULARY, KeywordFeatureEngine, feature_layout, load_vocabulary
+
+RANDOM_STATE = 33
+
+# Bump when the feature definitions change so stale cached matrices are ignored
+FEATURE_VERSION = 2
+
+# Same grid as the notebook. C is searched in ascending order so every fit
+# along the path warm-starts from the more heavily regularized solution.
+L1_RATIOS = [0.1, 0.5, 0.7, 0.9]
+C_PATH = [0.01, 0.1, 1, 10]
+
+
+def load_training_frame(episodes_csv: str, labels_csv: str) -> pl.DataFrame:
+    """
+    Join the labeled episode types onto the scraped episode metadata.
+
+    Args:
+        episodes_csv: Path to the podcast_episodes.csv written by get_rss_info.py
+        labels_csv: Path to the episode_types.csv written by the labeling app
+
+    Returns:
+        pl.DataFrame: One row per labeled episode with typed columns
+    """
+    df_episodes = pl.read_csv(episodes_csv)
+    df_banger = pl.read_csv(labels_csv)
+    df_all = df_banger.join(df_episodes, left_on="episode", right_on="title", how="left")
+
+    # Serving keys embeddings by RSS guid and falls back to the title when an
+    # item has none; CSVs scraped before guids were recorded only have titles
+    guid = pl.coalesce(pl.col("guid"), pl.col("episode")) if "guid" in df_all.columns else pl.col("episode")
+
+    return df_all.select(
+        guid.cast(pl.Utf8).alias("guid"),
+        pl.col("episode"),
+        pl.col("banger").cast(pl.Utf8),
+        pl.col("date").str.strptime(pl.Datetime, format="%Y-%m-%d %H:%M:%S"),
+        pl.col("description"),
+        pl.col("duration").alias("duration_secs"),
+    )
+
+
+def engineer_features(df_types: pl.DataFrame, engine: KeywordFeatureEngine) -> pl.DataFrame:
+    """
+    Build the model features plus the outcome column.
+
+    Args:
+        df_types: Output of load_training_frame
+        engine: Keyword engine for the vocabulary being trained on
+
+    Returns:
+        pl.DataFrame: feature_layout(engine.feature_names) columns as Float32
+        followed by 'guid' and 'banger'
+    """
+    feature_names = feature_layout(engine.feature_names)
+    keyword_flags = engine.transform(df_types)
+
+    return pl.concat([
+        df_types.select(
+            pl.col("date").dt.year().alias("year"),
+            pl.col("date").dt.month().alias("month"),
+            pl.col("date").dt.weekday().alias("weekday"),
+            pl.col("date").dt.hour().alias("hour"),
+            (pl.col("duration_secs") > 1800).alias("longer_thirty_min"),
+            pl.col("duration_secs"),
+            pl.col("guid"),
+            pl.col("banger"),
+        ),
+        pl.DataFrame(keyword_flags, schema=engine.feature_names, orient="row"),
+    ], how="horizontal").drop_nulls().select(
+        pl.col(feature_names).cast(pl.Float32),
+        pl.col("guid"),
+        pl.col("banger"),
+    )
+
+
+def _file_digest(*paths: str) -> str:
+    """Hash the contents of the input files together with FEATURE_VERSION."""
+    digest = hashlib.sha256(f"features-v{FEATURE_VERSION}".encode())
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def load_feature_matrix(episodes_csv: str, labels_csv: str, cache_dir: str,
+                        embedding_store: Optional[str] = None,
+                        vocabulary_path: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, List[str], bool]:
+    """
+    Load the feature matrix from the on-disk cache, building it on a miss.
+
+    Args:
+        episodes_csv: Path to the scraped episodes CSV
+        labels_csv: Path to the labeled episode types CSV
+        cache_dir: Directory holding cached feature matrices
+        embedding_store: Optional feature store directory whose description
+            embeddings are appended after the keyword and numeric features
+        vocabulary_path: Optional keyword vocabulary JSON (defaults to the
+            vocabulary the served model uses)
+
+    Returns:
+        Tuple of the float32 feature matrix, the outcome labels, the feature
+        names in column order, and whether the cache was hit
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    engine = KeywordFeatureEngine(load_vocabulary(vocabulary_path) if vocabulary_path else DEFAULT_VOCABULARY)
+    feature_names = feature_layout(engine.feature_names)
+    # The serving app's store, so training sees exactly the vectors (and the
+    # centroid fallback for missing episodes) that will be served
+    store = EmbeddingFeatureStore(embedding_store) if embedding_store else None
+    if store is not None:
+        feature_names += store.column_names
+
+    inputs = [episodes_csv, labels_csv] + ([vocabulary_path] if vocabulary_path else [])
+    if embedding_store:
+        inputs += [os.path.join(embedding_store, name) for name in sorted(os.listdir(embedding_store))
+                   if name.endswith((".npy", ".json"))]
+    cache_file = os.path.join(cache_dir, f"features-{_file_digest(*inputs)}.npz")
+
+    if os.path.exists(cache_file):
+        with np.load(cache_file, allow_pickle=False) as cached:
+            return cached["X"], cached["y"], feature_names, True
+
+    df_features = engineer_features(load_training_frame(episodes_csv, labels_csv), engine)
+    X = df_features.select(feature_layout(engine.feature_names)).to_numpy().astype(np.float32)
+    y = df_features["banger"].to_numpy().astype(str)
+    if store is not None:
+        X = np.hstack([X, store.lookup(df_features["guid"].to_list())])
+
+    # Write to a temp file first so an interrupted run never leaves a torn cache entry
+    tmp_file = cache_file + ".tmp.npz"
+    np.savez(tmp_file, X=X, y=y)
+    os.replace(tmp_file, cache_file)
+    return X, y, feature_names, False
+
+
+def build_pipeline(memory: Optional[str]) -> Pipeline:
+    """
+    Create the scaler + elastic net pipeline used throughout the search.
+
+    Args:
+        memory: Directory for memoizing the fitted scaler, or None to disable
+
+    Returns:
+        Pipeline: Unfitted pipeline with warm starts enabled on the classifier
+    """
+    return Pipeline(
+        [
+            ("scaler", StandardScaler()),
+            ("classifier", LogisticRegression(penalty="elasticnet", solver="saga",
+                                              random_state=RANDOM_STATE, max_iter=1000,
+                                              warm_start=True)),
+        ],
+        memory=memory,
+    )
+
+
+def _fit_regularization_path(pipeline: Pipeline, X: np.ndarray, y: np.ndarray,
+                             train_idx: np.ndarray, val_idx: np.ndarray,
+                             l1_ratio: float, deadline: float) -> List[Dict]:
+    """
+    Fit one fold for one l1_ratio across the whole C path.
+
+    The same classifier instance is refit for each C so saga starts from the
+    previous coefficients, and the scaler is pulled from the memory cache after
+    the first fit.
+
+    Returns:
+        list: One result dict per C that finished before the deadline
+    """
+    pipeline = clone(pipeline)
+    pipeline.set_params(classifier__l1_ratio=l1_ratio)
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_val, y_val = X[val_idx], y[val_idx]
+
+    results = []
+    for C in C_PATH:
+        if time.time() > deadline:
+            break
+        start = time.perf_counter()
+        pipeline.set_params(classifier__C=C)
+        pipeline.fit(X_train, y_train)
+        results.append({
+            "l1_ratio": l1_ratio,
+            "C": C,
+            "accuracy": accuracy_score(y_val, pipeline.predict(X_val)),
+            "fit_secs": time.perf_counter() - start,
+        })
+    return results
+
+
+def search_hyperparameters(X: np.ndarray, y: np.ndarray, memory: Optional[str],
+                           n_jobs: int, budget_secs: float) -> Dict:
+    """
+    Cross-validate the elastic net grid in parallel within a wall-clock budget.
+
+    Each (fold, l1_ratio) pair is an independent job that walks the C path.
+    The budget only stops a runaway search: if any grid point misses a fold
+    the search fails instead of picking from the points that happened to
+    finish, which would make the chosen params depend on machine speed.
+
+    Args:
+        X: Training features
+        y: Training labels
+        memory: Pipeline memory directory
+        n_jobs: Number of parallel jobs (-1 for all cores)
+        budget_secs: Wall-clock budget for the whole search
+
+    Returns:
+        dict: Best params and per grid point scores
+
+    Raises:
+        RuntimeError: The budget ran out before every grid point finished
+    """
+    kfold = StratifiedKFold(n_splits=5, shuffle=True, random_state=RANDOM_STATE)
+    folds = list(kfold.split(X, y))
+    deadline = time.time() + budget_secs
+    pipeline = build_pipeline(memory)
+
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_regularization_path)(pipeline, X, y, train_idx, val_idx, l1_ratio, deadline)
+        for (train_idx, val_idx), l1_ratio in itertools.product(folds, L1_RATIOS)
+    )
+
+    scores: Dict[Tuple[float, float], List[float]] = {}
+    for result in itertools.chain.from_iterable(fold_results):
+        scores.setdefault((result["l1_ratio"], result["C"]), []).append(result["accuracy"])
+
+    grid = []
+    for l1_ratio, C in itertools.product(L1_RATIOS, C_PATH):
+        fold_scores = scores.get((l1_ratio, C), [])
+        grid.append({
+            "l1_ratio": l1_ratio,
+            "C": C,
+            "folds_completed": len(fold_scores),
+            "mean_accuracy": float(np.mean(fold_scores)) if len(fold_scores) == len(folds) else None,
+        })
+
+    unfinished = sum(1 for g in grid if g["mean_accuracy"] is None)
+    if unfinished:
+        raise RuntimeError(f"{unfinished} of {len(grid)} grid points did not finish all folds within the "
+                           f"{budget_secs}s budget; rerun with a larger --budget-secs")
+
+    # Deterministic tie-break: prefer stronger regularization, then lower l1_ratio
+    best = min(grid, key=lambda g: (-g["mean_accuracy"], g["C"], g["l1_ratio"]))
+    return {
+        "best_params": {"l1_ratio": best["l1_ratio"], "C": best["C"]},
+        "best_cv_accuracy": best["mean_accuracy"],
+        "grid": grid,
+    }
+
+
+def export_onnx(model: Pipeline, n_features: int, output_path: str) -> bytes:
+    """
+    Convert the fitted pipeline to ONNX with plain tensor outputs.
+
+    ZipMap is disabled so the probabilities come back as an (n, 2) float
+    tensor ordered like model.classes_ instead of a list of dicts. The graph
+    gets a fixed name (skl2onnx defaults to a random uuid), so retraining on
+    the same data writes the same bytes and the same model_sha256.
+
+    Args:
+        model: Fitted pipeline
+        n_features: Number of input columns
+        output_path: Where to write the .onnx file
+
+    Returns:
+        bytes: The serialized model
+    """
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+
+    initial_types = [("float_input", FloatTensorType([None, n_features]))]
+    onnx_model = convert_sklearn(
+        model,
+        name="episode_banger_model",
+        initial_types=initial_types,
+        target_opset=15,
+        options={LogisticRegression: {"zipmap": False}},
+    )
+    serialized = onnx_model.SerializeToString()
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "wb") as f:
+        f.write(serialized)
+    return serialized
+
+
+def check_onnx_parity(model: Pipeline, model_bytes: bytes, X: np.ndarray) -> float:
+    """Return the max absolute difference between sklearn and ONNX probabilities."""
+    import onnxruntime as rt
+
+    sess = rt.InferenceSession(model_bytes, providers=["CPUExecutionProvider"])
+    input_name = sess.get_inputs()[0].name
+    onnx_probs = sess.run(None, {input_name: X.astype(np.float32)})[1]
+    return float(np.max(np.abs(onnx_probs - model.predict_proba(X))))
+
+
+def train(episodes_csv: str, labels_csv: str, output_path: str, report_path: str,
+          cache_dir: str, n_jobs: int, budget_secs: float, embedding_store: Optional[str] = None,
+          vocabulary_path: Optional[str] = None) -> Dict:
+    """
+    Run the full training workflow and write the model and report.
+
+    Returns:
+        dict: The metrics/timing report that was written to report_path
+    """
+    timings = {}
+    total_start = time.perf_counter()
+
+    start = time.perf_counter()
+    X, y, feature_names, cache_hit = load_feature_matrix(episodes_csv, labels_csv, cache_dir,
+                                                         embedding_store, vocabulary_path)
+    timings["features_secs"] = time.perf_counter() - start
+    print(f"Loaded {X.shape[0]} episodes x {X.shape[1]} features (cache {'hit' if cache_hit else 'miss'})")
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.25, random_state=RANDOM_STATE, stratify=y
+    )
+
+    memory = os.path.join(cache_dir, "pipeline")
+    start = time.perf_counter()
+    search = search_hyperparameters(X_train, y_train, memory, n_jobs, budget_secs)
+    timings["search_secs"] = time.perf_counter() - start
+    print("Best Parameters:", search["best_params"])
+    print("Best Cross-Validation Score:", search["best_cv_accuracy"])
+
+    start = time.perf_counter()
+    best_model = build_pipeline(memory)
+    best_model.set_params(
+        classifier__l1_ratio=search["best_params"]["l1_ratio"],
+        classifier__C=search["best_params"]["C"],
+    )
+    best_model.fit(X_train, y_train)
+    timings["refit_secs"] = time.perf_counter() - start
+
+    y_pred = best_model.predict(X_test)
+    print("\nClassification Report on Test Set:\n")
+    print(classification_report(y_test, y_pred))
+
+    start = time.perf_counter()
+    model_bytes = export_onnx(best_model, X.shape[1], output_path)
+    timings["export_secs"] = time.perf_counter() - start
+    onnx_max_abs_diff = check_onnx_parity(best_model, model_bytes, X_test)
+    timings["total_secs"] = time.perf_counter() - total_start
+
+    report = {
+        "model_path": output_path,
+        "model_sha256": hashlib.sha256(model_bytes).hexdigest(),
+        "feature_names": feature_names,
+        "embedding_store": embedding_store,
+        "keyword_vocabulary": vocabulary_path,
+        "classes": [str(c) for c in best_model.classes_],
+        "n_train": int(len(y_train)),
+        "n_test": int(len(y_test)),
+        "feature_cache_hit": cache_hit,
+        "search": search,
+        "test_accuracy": float(accuracy_score(y_test, y_pred)),
+        "test_f1_yes": float(f1_score(y_test, y_pred, pos_label="yes")),
+        "onnx_max_abs_diff": onnx_max_abs_diff,
+        "timings": timings,
+    }
+
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Model saved to {output_path} ({report['model_sha256'][:12]})")
+    print(f"Report saved to {report_path}, total {timings['total_secs']:.2f}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the Dunc'd On banger model and export it to ONNX")
+    parser.add_argument("--episodes-csv", default="data/labeling-app/podcast_episodes.csv")
+    parser.add_argument("--labels-csv", default="data/labeling-app/episode_types.csv")
+    parser.add_argument("--output", default="modeling_scripts/episode_banger_model.onnx")
+    parser.add_argument("--report", default="modeling_scripts/training_report.json")
+    parser.add_argument("--cache-dir", default=".train_cache")
+    parser.add_argument("--embedding-store", default=None,
+                        help="Feature store directory; appends description embeddings to the features")
+    parser.add_argument("--keyword-vocabulary", default=None,
+                        help="Keyword vocabulary JSON; serve the model with the same file in KEYWORD_VOCABULARY")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--budget-secs", type=float, default=120.0,
+                        help="Wall-clock limit for the hyperparameter search; training fails "
+                             "rather than choosing from a partial grid")
+    args = parser.parse_args()
+
+    train(
+        episodes_csv=args.episodes_csv,
+        labels_csv=args.labels_csv,
+        output_path=args.output,
+        report_path=args.report,
+        cache_dir=args.cache_dir,
+        n_jobs=args.n_jobs,
+        budget_secs=args.budget_secs,
+        embedding_store=args.embedding_store,
+        vocabulary_path=args.keyword_vocabulary,
+    )
+
+
+if __name__ == "__main__":
+    main()